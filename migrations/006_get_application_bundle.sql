@@ -0,0 +1,62 @@
+-- ============================================================================
+-- SAK AI Agent - Application Bundle RPC Migration v1.0
+-- ============================================================================
+-- This migration creates get_application_bundle, which returns an application
+-- with its party roles, attachments and POA extractions in one round-trip.
+-- Used by load_application in poa_agents/shared/supabase_client.py.
+-- Run this in Supabase SQL Editor
+-- ============================================================================
+
+-- ============================================================================
+-- STEP 1: CREATE FUNCTION
+-- ============================================================================
+
+-- Same shape as the PostgREST embedded selects it replaces:
+--   party_roles[].personal_parties      (joined personal_parties row)
+--   attachments[].document_extractions  (array of extraction rows)
+CREATE OR REPLACE FUNCTION get_application_bundle(app_id uuid)
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT to_jsonb(a) || jsonb_build_object(
+        'party_roles', COALESCE((
+            SELECT jsonb_agg(to_jsonb(r) || jsonb_build_object('personal_parties', to_jsonb(p)))
+            FROM application_party_roles r
+            LEFT JOIN personal_parties p ON p.id = r.personal_party_id
+            WHERE r.application_id = a.id
+        ), '[]'::jsonb),
+        'attachments', COALESCE((
+            SELECT jsonb_agg(to_jsonb(t) || jsonb_build_object(
+                'document_extractions', COALESCE((
+                    SELECT jsonb_agg(to_jsonb(d))
+                    FROM document_extractions d
+                    WHERE d.attachment_id = t.id
+                ), '[]'::jsonb)
+            ))
+            FROM attachments t
+            WHERE t.application_id = a.id
+        ), '[]'::jsonb),
+        'poa_extractions', COALESCE((
+            SELECT jsonb_agg(to_jsonb(e))
+            FROM poa_extractions e
+            WHERE e.application_id = a.id
+        ), '[]'::jsonb)
+    )
+    FROM applications a
+    WHERE a.id = app_id;
+$$;
+
+-- Grant execute permission to authenticated and anon users
+GRANT EXECUTE ON FUNCTION get_application_bundle TO authenticated;
+GRANT EXECUTE ON FUNCTION get_application_bundle TO anon;
+
+-- ============================================================================
+-- STEP 2: ADD COMMENTS
+-- ============================================================================
+
+COMMENT ON FUNCTION get_application_bundle IS 'Application row with party_roles (+ personal_parties), attachments (+ document_extractions) and poa_extractions as one JSON document; NULL if the application does not exist.';
+
+-- ============================================================================
+-- MIGRATION COMPLETE
+-- ============================================================================
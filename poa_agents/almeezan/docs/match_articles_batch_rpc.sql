@@ -0,0 +1,47 @@
+-- RPC Function for batched semantic search used by shared/rag_client.py
+-- Runs match_articles once per query embedding in a single round-trip.
+-- Requires the existing match_articles(query_embedding, match_threshold, match_count).
+-- Run this in Supabase SQL Editor to create the function
+
+CREATE OR REPLACE FUNCTION match_articles_batch(
+    query_embeddings jsonb,  -- JSON array of 1536-dim embeddings (arrays or '[...]' literals)
+    match_threshold float DEFAULT 0.3,
+    match_count int DEFAULT 5
+)
+RETURNS TABLE (
+    query_idx int,  -- 0-based position of the query in query_embeddings
+    article_number int,
+    text_arabic text,
+    text_english text,
+    hierarchy_path jsonb,
+    similarity float
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        (q.idx - 1)::int AS query_idx,
+        m.article_number,
+        m.text_arabic,
+        m.text_english,
+        m.hierarchy_path,
+        m.similarity
+    FROM jsonb_array_elements_text(query_embeddings) WITH ORDINALITY AS q(embedding, idx)
+    CROSS JOIN LATERAL match_articles(
+        q.embedding::vector(1536),
+        match_threshold,
+        match_count
+    ) AS m
+    ORDER BY q.idx, m.similarity DESC;
+$$;
+
+-- Grant execute permission to authenticated and anon users
+GRANT EXECUTE ON FUNCTION match_articles_batch TO authenticated;
+GRANT EXECUTE ON FUNCTION match_articles_batch TO anon;
+
+-- Test the function (replace with actual embedding vectors)
+-- SELECT * FROM match_articles_batch(
+--     '[[0.1, 0.2, ...], [0.3, 0.4, ...]]'::jsonb,
+--     0.3,
+--     3
+-- );
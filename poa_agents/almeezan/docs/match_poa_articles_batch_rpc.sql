@@ -0,0 +1,57 @@
+-- RPC Function for batched semantic search on poa_articles table
+-- Runs match_poa_articles once per query embedding in a single round-trip.
+-- Requires match_poa_articles (see match_poa_articles_rpc.sql).
+-- Run this in Supabase SQL Editor to create the function
+
+-- Replaces the earlier signatures without exclude_ids / ef_search
+DROP FUNCTION IF EXISTS match_poa_articles_batch(jsonb, float, int, text);
+DROP FUNCTION IF EXISTS match_poa_articles_batch(jsonb, float, int, text, int[]);
+
+CREATE OR REPLACE FUNCTION match_poa_articles_batch(
+    query_embeddings jsonb,  -- JSON array of 1536-dim embeddings (arrays or '[...]' literals)
+    match_threshold float DEFAULT 0.3,
+    match_count int DEFAULT 10,
+    language text DEFAULT 'english',
+    exclude_ids int[] DEFAULT '{}',  -- article numbers the caller already has
+    ef_search int DEFAULT NULL  -- HNSW candidate list size; NULL = derived from match_count
+)
+RETURNS TABLE (
+    query_idx int,  -- 0-based position of the query in query_embeddings
+    id bigint,
+    article_number int,
+    law_id int,
+    text_arabic text,
+    text_english text,
+    hierarchy_path jsonb,
+    citation jsonb,
+    similarity float
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        (q.idx - 1)::int AS query_idx,
+        m.*
+    FROM jsonb_array_elements_text(query_embeddings) WITH ORDINALITY AS q(embedding, idx)
+    CROSS JOIN LATERAL match_poa_articles(
+        q.embedding::vector(1536),
+        match_threshold,
+        match_count,
+        language,
+        exclude_ids,
+        ef_search
+    ) AS m
+    ORDER BY q.idx, m.similarity DESC;
+$$;
+
+-- Grant execute permission to authenticated and anon users
+GRANT EXECUTE ON FUNCTION match_poa_articles_batch TO authenticated;
+GRANT EXECUTE ON FUNCTION match_poa_articles_batch TO anon;
+
+-- Test the function (replace with actual embedding vectors)
+-- SELECT * FROM match_poa_articles_batch(
+--     '[[0.1, 0.2, ...], [0.3, 0.4, ...]]'::jsonb,
+--     0.3,
+--     5,
+--     'arabic'
+-- );
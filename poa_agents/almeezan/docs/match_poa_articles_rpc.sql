@@ -1,11 +1,17 @@
 -- RPC Function for semantic search on poa_articles table
 -- Run this in Supabase SQL Editor to create the function
 
+-- Replaces the earlier signatures without exclude_ids / ef_search
+DROP FUNCTION IF EXISTS match_poa_articles(vector, float, int, text);
+DROP FUNCTION IF EXISTS match_poa_articles(vector, float, int, text, int[]);
+
 CREATE OR REPLACE FUNCTION match_poa_articles(
     query_embedding vector(1536),
     match_threshold float DEFAULT 0.3,
     match_count int DEFAULT 10,
-    language text DEFAULT 'english'
+    language text DEFAULT 'english',
+    exclude_ids int[] DEFAULT '{}',  -- article numbers the caller already has
+    ef_search int DEFAULT NULL  -- HNSW candidate list size; NULL = derived from match_count
 )
 RETURNS TABLE (
     id bigint,
@@ -20,6 +26,14 @@ RETURNS TABLE (
 LANGUAGE plpgsql
 AS $$
 BEGIN
+    -- The HNSW scan yields ef_search candidates before the threshold, is_active
+    -- and exclude_ids filters run, so size it well above match_count
+    PERFORM set_config(
+        'hnsw.ef_search',
+        COALESCE(ef_search, GREATEST(match_count * 4, 40) + cardinality(exclude_ids))::text,
+        true  -- local to the current transaction
+    );
+
     IF language = 'arabic' THEN
         -- Use arabic_embedding for Arabic queries
         RETURN QUERY
@@ -36,6 +50,7 @@ BEGIN
         WHERE p.arabic_embedding IS NOT NULL
           AND p.is_active = TRUE
           AND (1 - (p.arabic_embedding <=> query_embedding)) >= match_threshold
+          AND p.article_number <> ALL(exclude_ids)
         ORDER BY p.arabic_embedding <=> query_embedding
         LIMIT match_count;
     ELSE
@@ -54,6 +69,7 @@ BEGIN
         WHERE p.embedding IS NOT NULL
           AND p.is_active = TRUE
           AND (1 - (p.embedding <=> query_embedding)) >= match_threshold
+          AND p.article_number <> ALL(exclude_ids)
         ORDER BY p.embedding <=> query_embedding
         LIMIT match_count;
     END IF;
@@ -69,5 +85,7 @@ GRANT EXECUTE ON FUNCTION match_poa_articles TO anon;
 --     '[0.1, 0.2, ...]'::vector(1536),
 --     0.3,
 --     10,
---     'arabic'
+--     'arabic',
+--     ARRAY[12, 45],
+--     NULL
 -- );
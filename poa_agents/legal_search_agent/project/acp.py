@@ -7,6 +7,7 @@ Performs statute-grounded legal research using:
 3. Synthesis - Generate legal opinion with citations
 4. Verification - Check grounding and consistency
 """
+import asyncio
 import os
 import sys
 import json
@@ -43,6 +44,10 @@ from project.models.retrieval_state import RetrievalConfig, ArticleResult
 logger = make_logger(__name__)
 logger.info(f"Loaded environment from {env_path}")
 
+# One concurrent LLM call per issue (merged in Python) instead of a single
+# combined synthesis call
+SYNTHESIS_PER_ISSUE = os.getenv("SYNTHESIS_PER_ISSUE", "true").lower() == "true"
+
 # Initialize clients
 _supabase_client: Optional[LegalSearchSupabaseClient] = None
 _llm_client: Optional[LegalSearchLLMClient] = None
@@ -196,7 +201,7 @@ async def handle_message_send(
         # Load Legal Brief from Supabase if not provided
         if application_id and not legal_brief:
             logger.info(f"Loading Legal Brief for application: {application_id}")
-            brief_row = supabase.get_legal_brief(application_id)
+            brief_row = await asyncio.to_thread(supabase.get_legal_brief, application_id)
             if not brief_row:
                 return TextContent(
                     author="agent",
@@ -240,24 +245,25 @@ async def handle_message_send(
         logger.info(f"  - Coverage score: {retrieval_artifact.coverage_score:.0%}")
         logger.info(f"  - Avg similarity: {retrieval_artifact.avg_similarity:.0%}")
 
-        # Save retrieval artifact for evaluation (non-blocking)
-        try:
-            supabase.save_retrieval_artifact(retrieval_artifact)
-        except Exception as e:
-            logger.warning(f"Could not save retrieval artifact: {e}")
+        # Save retrieval artifact for evaluation (non-blocking, overlaps synthesis)
+        artifact_save = asyncio.create_task(
+            asyncio.to_thread(supabase.save_retrieval_artifact, retrieval_artifact)
+        )
 
-        # Convert ArticleResults to dicts for synthesizer
+        # Convert ArticleResults to dicts for synthesizer (once per article;
+        # the per-issue lists below share these dicts)
         unique_articles = [article_result_to_dict(art) for art in article_results]
 
         # Build issue_evidence mapping from article's matched_legal_areas
         issue_evidence = {}
         for issue in issues:
             issue_id = issue.get("issue_id", "unknown")
+            category = issue.get("category", "")
             # Find articles relevant to this issue based on matched areas
             issue_articles = [
-                article_result_to_dict(art)
-                for art in article_results
-                if any(area in art.matched_legal_areas for area in [issue.get("category", "")])
+                article_dict
+                for art, article_dict in zip(article_results, unique_articles)
+                if category in art.matched_legal_areas
             ]
             # If no matches by area, use all articles (fallback)
             if not issue_articles:
@@ -271,7 +277,10 @@ async def handle_message_send(
         # ========================================
         logger.info(f"Phase 3: Synthesizing legal opinion (locale={locale})...")
 
-        opinion = await synthesizer.synthesize(
+        synthesize = (
+            synthesizer.synthesize_per_issue if SYNTHESIS_PER_ISSUE else synthesizer.synthesize
+        )
+        opinion = await synthesize(
             legal_brief=legal_brief,
             issues=issues,
             issue_evidence=issue_evidence,
@@ -308,11 +317,18 @@ async def handle_message_send(
         # ========================================
         if application_id:
             try:
-                supabase.save_legal_opinion(application_id, opinion, brief_id)
+                await asyncio.to_thread(
+                    supabase.save_legal_opinion, application_id, opinion, brief_id
+                )
                 logger.info(f"Saved legal opinion for application: {application_id}")
             except Exception as e:
                 logger.warning(f"Could not save legal opinion: {e}")
 
+        try:
+            await artifact_save
+        except Exception as e:
+            logger.warning(f"Could not save retrieval artifact: {e}")
+
         # Format output
         output = format_legal_opinion(opinion)
 
@@ -0,0 +1,73 @@
+"""
+Prompt formatters for the Synthesizer.
+
+Kept in their own fully-annotated module so the Docker build can compile
+them with mypyc; the pure-Python module is used when no compiled
+extension is present.
+"""
+
+
+def format_articles(
+    articles: list[dict],
+    locale: str = "ar",
+    max_chars: int = 1500
+) -> str:
+    """
+    Format articles for the prompt.
+
+    Only the text in the requested locale is included (falling back to the
+    other language when missing), capped at max_chars per article.
+    """
+    if not articles:
+        return "لم يتم العثور على مواد ذات صلة."
+
+    lines: list[str] = []
+    for art in articles:
+        # Use citation info if available (from poa_articles table)
+        citation: dict = art.get("citation") or {}
+        if citation.get("formatted_ar"):
+            lines.append(f"### {citation.get('formatted_ar')}")
+        else:
+            lines.append(f"### مادة {art.get('article_number', '?')}")
+            if art.get("law_name"):
+                lines.append(f"القانون: {art.get('law_name')}")
+            elif citation.get("law_name_ar"):
+                lines.append(f"القانون: {citation.get('law_name_ar')}")
+
+        text_ar: str = art.get("text_arabic") or art.get("text_ar") or ""
+        text_en: str = art.get("text_english") or art.get("text_en") or ""
+
+        # Emit a single language: the locale's own text, else the other one
+        if locale == "en":
+            if text_en:
+                lines.append(f"Text: {text_en[:max_chars]}")
+            elif text_ar:
+                lines.append(f"Text (Arabic - please translate to English in output): {text_ar[:max_chars]}")
+        elif text_ar:
+            lines.append(f"النص: {text_ar[:max_chars]}")
+        elif text_en:
+            lines.append(f"النص (إنجليزي - يرجى ترجمته للعربية في المخرجات): {text_en[:max_chars]}")
+
+        # Low similarity scores are noise for the model
+        similarity: float = art.get("similarity") or 0.0
+        if similarity >= 0.5:
+            lines.append(f"التشابه: {similarity:.0%}")
+        lines.append("")
+
+    return "\n".join(lines)
+
+
+def format_issue_evidence(issue_evidence: dict[str, list[dict]]) -> str:
+    """Format issue evidence for the prompt."""
+    lines: list[str] = []
+    for issue_id, articles in issue_evidence.items():
+        lines.append(f"### {issue_id}")
+        if articles:
+            for art in articles:
+                similarity: float = art.get("similarity") or 0.0
+                lines.append(f"- مادة {art.get('article_number')}: {similarity:.0%}")
+        else:
+            lines.append("- لم يتم العثور على مواد ذات صلة")
+        lines.append("")
+
+    return "\n".join(lines)
@@ -0,0 +1,45 @@
+"""
+Shared prompt-building runtime for the Legal Search Agent components.
+
+Templates are split once at import into interned literal segments, and
+prompts are built with a single str.join instead of str.format.
+"""
+import sys
+from itertools import chain
+
+import orjson
+
+
+def compile_template(template: str, fields: tuple[str, ...]) -> tuple[str, ...]:
+    """
+    Split a str.format template into literal segments around its placeholders.
+
+    Args:
+        template: Template using {field} placeholders and {{ }} escapes
+        fields: Placeholder names, in the order they appear in the template
+
+    Returns:
+        len(fields) + 1 literal segments with escapes resolved
+    """
+    segments = []
+    rest = template
+    for field in fields:
+        head, rest = rest.split("{" + field + "}", 1)
+        segments.append(head.replace("{{", "{").replace("}}", "}"))
+    segments.append(rest.replace("{{", "{").replace("}}", "}"))
+    return intern_prompt_segments(segments)
+
+
+def intern_prompt_segments(segments) -> tuple[str, ...]:
+    """Intern static prompt segments so every builder shares one copy."""
+    return tuple(sys.intern(segment) for segment in segments)
+
+
+def build(template_segments: tuple[str, ...], *values: str) -> str:
+    """Interleave compiled template segments with placeholder values."""
+    return "".join(chain.from_iterable(zip(template_segments, (*values, ""))))
+
+
+def dumps_compact(obj) -> str:
+    """Serialize to compact, non-ASCII-escaped JSON for embedding in a prompt."""
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
@@ -5,12 +5,15 @@ Analyzes which legal areas are covered by retrieved articles
 and identifies gaps that need additional retrieval.
 """
 import os
+import numpy as np
 import yaml
 from pathlib import Path
 from typing import TYPE_CHECKING, Optional
 
 from agentex.lib.utils.logging import make_logger
 
+from project.llm_client import LLMUnavailableError
+
 if TYPE_CHECKING:
     from project.llm_client import LegalSearchLLMClient
     from project.models.retrieval_state import ArticleResult, CoverageStatus
@@ -136,32 +139,31 @@ class CoverageAnalyzer:
             )
 
             # Calculate metrics
-            article_numbers = [a.article_number for a in matching_articles]
-            similarities = [a.similarity for a in matching_articles]
-            avg_sim = sum(similarities) / len(similarities) if similarities else 0.0
-            max_sim = max(similarities) if similarities else 0.0
+            status_entry = CoverageStatus(
+                area_id=area_id,
+                area_name_en=area_config.get("name_en", area_id),
+                area_name_ar=area_config.get("name_ar", area_id),
+                required=area_config.get("required", False),
+                articles_found=[a.article_number for a in matching_articles],
+            )
+            status_entry.record_similarities(np.fromiter(
+                (a.similarity for a in matching_articles),
+                dtype=np.float32,
+                count=len(matching_articles),
+            ))
 
             # Determine status
             min_sim = area_config.get("min_similarity", 0.5)
             min_articles = area_config.get("min_articles", 1)
 
-            if len(matching_articles) >= min_articles and avg_sim >= min_sim:
-                status = "covered"
+            if len(matching_articles) >= min_articles and status_entry.avg_similarity >= min_sim:
+                status_entry.status = "covered"
             elif len(matching_articles) > 0:
-                status = "weak"
+                status_entry.status = "weak"
             else:
-                status = "missing"
+                status_entry.status = "missing"
 
-            coverage[area_id] = CoverageStatus(
-                area_id=area_id,
-                area_name_en=area_config.get("name_en", area_id),
-                area_name_ar=area_config.get("name_ar", area_id),
-                required=area_config.get("required", False),
-                articles_found=article_numbers,
-                avg_similarity=avg_sim,
-                max_similarity=max_sim,
-                status=status
-            )
+            coverage[area_id] = status_entry
 
             # Update articles with matched areas
             for article in matching_articles:
@@ -314,6 +316,15 @@ class CoverageAnalyzer:
 
             return json.loads(clean_response.strip())
 
+        except LLMUnavailableError as e:
+            logger.warning(f"LLM unavailable, skipping agent assessment: {e}")
+            return {
+                "sufficient": False,
+                "confidence": 0.0,
+                "reasoning_ar": "تعذر التقييم: خدمة النموذج غير متاحة",
+                "missing_areas": [],
+                "suggested_queries_ar": []
+            }
         except Exception as e:
             logger.error(f"Agent assessment failed: {e}")
             return {
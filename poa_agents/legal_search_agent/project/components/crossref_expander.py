@@ -4,6 +4,7 @@ Cross-Reference Expander Component.
 Detects references to other articles in retrieved text and
 fetches those referenced articles to enable multi-hop reasoning.
 """
+import asyncio
 import re
 from typing import TYPE_CHECKING
 
@@ -11,7 +12,7 @@ from agentex.lib.utils.logging import make_logger
 
 if TYPE_CHECKING:
     from project.supabase_client import LegalSearchSupabaseClient
-    from project.models.retrieval_state import ArticleResult
+    from project.models.retrieval_state import ArticleResult, RetrievalState
 
 logger = make_logger(__name__)
 
@@ -139,29 +140,26 @@ class CrossRefExpander:
     def get_unique_references(
         self,
         articles: list["ArticleResult"],
-        already_fetched: set[int]
+        state: "RetrievalState"
     ) -> set[int]:
         """
         Get unique article numbers that need to be fetched.
 
         Args:
             articles: Current article set
-            already_fetched: Article numbers already in the set
+            state: Retrieval state, whose held, fetched and pending
+                articles are left out
 
         Returns:
             Set of article numbers to fetch
         """
-        to_fetch = set()
+        refs: set[int] = set()
 
         for article in articles:
             text = article.text_arabic or ""
-            refs = self.extract_references(text, article.article_number)
-
-            for ref in refs:
-                if ref not in already_fetched:
-                    to_fetch.add(ref)
+            refs.update(self.extract_references(text, article.article_number))
 
-        return to_fetch
+        return state.filter_new_refs(refs)
 
     async def fetch_referenced_articles(
         self,
@@ -178,18 +176,16 @@ class CrossRefExpander:
         Returns:
             List of article dicts
         """
-        fetched = []
+        fetched = await asyncio.to_thread(
+            self.supabase.get_articles_by_numbers, article_numbers
+        )
 
+        found = {a.get("article_number") for a in fetched}
         for art_num in article_numbers:
-            try:
-                article = self.supabase.get_article_by_number(art_num)
-                if article:
-                    fetched.append(article)
-                    logger.info(f"Fetched referenced Article {art_num}")
-                else:
-                    logger.warning(f"Referenced Article {art_num} not found")
-            except Exception as e:
-                logger.error(f"Failed to fetch Article {art_num}: {e}")
+            if art_num in found:
+                logger.info(f"Fetched referenced Article {art_num}")
+            else:
+                logger.warning(f"Referenced Article {art_num} not found")
 
         return fetched
 
@@ -229,16 +225,19 @@ class CrossRefExpander:
     async def expand_with_references(
         self,
         articles: list["ArticleResult"],
-        already_fetched: set[int],
+        state: "RetrievalState",
         iteration: int,
         max_refs: int = 10
     ) -> tuple[list["ArticleResult"], list[int]]:
         """
         Expand article set by fetching cross-referenced articles.
 
+        The fetched numbers are tracked in state.cross_refs_pending while the
+        fetch runs and in state.cross_refs_fetched afterwards.
+
         Args:
             articles: Current article set
-            already_fetched: Article numbers already fetched
+            state: Retrieval state tracking held and fetched articles
             iteration: Current iteration number
             max_refs: Maximum references to fetch
 
@@ -246,7 +245,7 @@ class CrossRefExpander:
             Tuple of (new ArticleResults, list of fetched article numbers)
         """
         # Find all unique references
-        to_fetch = self.get_unique_references(articles, already_fetched)
+        to_fetch = self.get_unique_references(articles, state)
 
         if not to_fetch:
             logger.info("No new cross-references to fetch")
@@ -254,6 +253,7 @@ class CrossRefExpander:
 
         # Limit the number of references
         to_fetch_list = sorted(to_fetch)[:max_refs]
+        to_fetch_set = set(to_fetch_list)
         logger.info(f"Fetching {len(to_fetch_list)} cross-referenced articles: {to_fetch_list}")
 
         # Build a map of which article referenced what
@@ -261,11 +261,16 @@ class CrossRefExpander:
         for article in articles:
             refs = self.extract_references(article.text_arabic or "", article.article_number)
             for ref in refs:
-                if ref in to_fetch_list and ref not in ref_sources:
+                if ref in to_fetch_set and ref not in ref_sources:
                     ref_sources[ref] = article.article_number
 
         # Fetch the articles
-        fetched_dicts = await self.fetch_referenced_articles(to_fetch_list)
+        state.cross_refs_pending.update(to_fetch_list)
+        try:
+            fetched_dicts = await self.fetch_referenced_articles(to_fetch_list)
+        finally:
+            state.cross_refs_pending.difference_update(to_fetch_list)
+        state.cross_refs_fetched.update(to_fetch_list)
 
         # Convert to ArticleResults
         new_articles = []
@@ -6,6 +6,9 @@ from typing import TYPE_CHECKING
 
 from agentex.lib.utils.logging import make_logger
 
+from project.components._prompt_runtime import build, compile_template, dumps_compact
+from project.llm_client import LLMUnavailableError
+
 if TYPE_CHECKING:
     from project.llm_client import LegalSearchLLMClient
 
@@ -149,6 +152,11 @@ Example output:
 ]"""
 
 
+# Pre-split once at import so building a prompt is a single str.join
+DECOMPOSE_PROMPT_SEGMENTS_AR = compile_template(DECOMPOSE_PROMPT_TEMPLATE_AR, ("legal_brief",))
+DECOMPOSE_PROMPT_SEGMENTS_EN = compile_template(DECOMPOSE_PROMPT_TEMPLATE_EN, ("legal_brief",))
+
+
 class Decomposer:
     """Decomposes Legal Brief into legal sub-issues for research."""
 
@@ -168,19 +176,21 @@ class Decomposer:
         """
         # Select prompts based on locale
         system_prompt = DECOMPOSE_SYSTEM_PROMPT_EN if locale == "en" else DECOMPOSE_SYSTEM_PROMPT_AR
-        prompt_template = DECOMPOSE_PROMPT_TEMPLATE_EN if locale == "en" else DECOMPOSE_PROMPT_TEMPLATE_AR
+        prompt_segments = DECOMPOSE_PROMPT_SEGMENTS_EN if locale == "en" else DECOMPOSE_PROMPT_SEGMENTS_AR
 
-        prompt = prompt_template.format(
-            legal_brief=json.dumps(legal_brief, ensure_ascii=False, indent=2)
-        )
+        prompt = build(prompt_segments, dumps_compact(legal_brief))
 
         logger.info(f"Calling LLM to decompose legal brief (locale={locale})...")
 
-        response = await self.llm.chat(
-            user_message=prompt,
-            system_message=system_prompt,
-            temperature=0.2
-        )
+        try:
+            response = await self.llm.chat(
+                user_message=prompt,
+                system_message=system_prompt,
+                temperature=0.2
+            )
+        except LLMUnavailableError as e:
+            logger.error(f"LLM unavailable, using open questions as issues: {e}")
+            return self._issues_from_open_questions(legal_brief)
 
         # Parse the response
         try:
@@ -216,19 +226,19 @@ class Decomposer:
 
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse decomposition response: {e}")
-            # Return a default issue based on the open questions
-            open_questions = legal_brief.get("open_questions", [])
-            if open_questions:
-                return [
-                    {
-                        "issue_id": f"ISSUE_{i+1}",
-                        "category": q.get("category", "compliance"),
-                        "primary_question": q.get("question", ""),
-                        "sub_questions": [],
-                        "relevant_facts": q.get("relevant_facts", []),
-                        "search_queries": [q.get("question", "")],
-                        "priority": 1 if q.get("priority") == "critical" else 2
-                    }
-                    for i, q in enumerate(open_questions)
-                ]
-            return []
+            return self._issues_from_open_questions(legal_brief)
+
+    def _issues_from_open_questions(self, legal_brief: dict) -> list[dict]:
+        """Default issues built from the brief's open questions."""
+        return [
+            {
+                "issue_id": f"ISSUE_{i+1}",
+                "category": q.get("category", "compliance"),
+                "primary_question": q.get("question", ""),
+                "sub_questions": [],
+                "relevant_facts": q.get("relevant_facts", []),
+                "search_queries": [q.get("question", "")],
+                "priority": 1 if q.get("priority") == "critical" else 2
+            }
+            for i, q in enumerate(legal_brief.get("open_questions", []))
+        ]
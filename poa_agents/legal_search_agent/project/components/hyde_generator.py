@@ -9,6 +9,8 @@ from typing import TYPE_CHECKING
 
 from agentex.lib.utils.logging import make_logger
 
+from project.llm_client import LLMUnavailableError
+
 if TYPE_CHECKING:
     from project.llm_client import LegalSearchLLMClient
 
@@ -87,6 +89,10 @@ class HydeGenerator:
 
             return hypothetical, latency_ms
 
+        except LLMUnavailableError as e:
+            logger.warning(f"LLM unavailable, skipping hypothetical: {e}")
+            latency_ms = int((time.time() - start_time) * 1000)
+            return "", latency_ms
         except Exception as e:
             logger.error(f"Failed to generate hypothetical: {e}")
             latency_ms = int((time.time() - start_time) * 1000)
@@ -136,6 +142,10 @@ class HydeGenerator:
 
             return hypotheticals, latency_ms
 
+        except LLMUnavailableError as e:
+            logger.warning(f"LLM unavailable, skipping hypotheticals: {e}")
+            latency_ms = int((time.time() - start_time) * 1000)
+            return [], latency_ms
         except Exception as e:
             logger.error(f"Failed to generate multiple hypotheticals: {e}")
             latency_ms = int((time.time() - start_time) * 1000)
@@ -14,6 +14,7 @@ import uuid
 from datetime import datetime
 from typing import TYPE_CHECKING, Optional
 
+import numpy as np
 from agentex.lib.utils.logging import make_logger
 
 from project.models.retrieval_state import (
@@ -29,6 +30,7 @@ from project.models.retrieval_state import (
 from project.components.hyde_generator import HydeGenerator
 from project.components.coverage_analyzer import CoverageAnalyzer
 from project.components.crossref_expander import CrossRefExpander
+from project.llm_client import LLMUnavailableError
 
 if TYPE_CHECKING:
     from project.llm_client import LegalSearchLLMClient
@@ -82,7 +84,10 @@ class RetrievalAgent:
         start_time = time.time()
 
         # Initialize state
-        state = RetrievalState(application_id=application_id)
+        state = RetrievalState(
+            application_id=application_id,
+            max_articles=self.config.max_articles,
+        )
 
         # Determine required legal areas based on transaction type
         transaction_type = legal_brief.get("case_summary", {}).get("transaction_type")
@@ -196,34 +201,36 @@ class RetrievalAgent:
                 iteration_log.llm_calls += 1
                 state.total_llm_calls += 1
 
-                # Search with each hypothetical
-                for i, hypothetical in enumerate(hypotheticals):
-                    query_log = QueryLog(
+                # Search with all hypotheticals in one batched round-trip
+                hyde_logs = [
+                    QueryLog(
                         query_id=f"{issue_id}_hyde_{i}",
                         query_type="hyde",
                         query_text=issue.get("primary_question", ""),
                         query_language="arabic",
                         hypothetical_generated=hypothetical,
-                        hyde_latency_ms=hyde_latency // len(hypotheticals) if hypotheticals else 0
+                        hyde_latency_ms=hyde_latency // len(hypotheticals)
                     )
+                    for i, hypothetical in enumerate(hypotheticals)
+                ]
 
-                    articles = await self._search_with_embedding(
-                        hypothetical,
-                        state,
-                        query_log,
-                        iteration_log.iteration_number
-                    )
+                await self._search_batch_with_embeddings(
+                    hypotheticals,
+                    state,
+                    hyde_logs,
+                    iteration_log.iteration_number
+                )
 
-                    iteration_log.queries.append(query_log)
-                    iteration_log.embedding_calls += 1
-                    state.total_embedding_calls += 1
+                iteration_log.queries.extend(hyde_logs)
+                iteration_log.embedding_calls += len(hyde_logs)
+                state.total_embedding_calls += len(hyde_logs)
 
             # Also do direct search with Arabic queries
             search_queries = issue.get("search_queries_ar", [])
             for query in search_queries[:2]:
-                if query in state.queries_tried:
+                if state.seen_query(query):
                     continue
-                state.queries_tried.add(query)
+                state.mark_query(query)
 
                 query_log = QueryLog(
                     query_id=f"{issue_id}_direct_{len(iteration_log.queries)}",
@@ -266,9 +273,9 @@ class RetrievalAgent:
             queries = gap.get("suggested_queries_ar", [])
 
             for query in queries[:2]:
-                if query in state.queries_tried:
+                if state.seen_query(query):
                     continue
-                state.queries_tried.add(query)
+                state.mark_query(query)
 
                 # Generate HyDE hypothetical for gap query
                 if self.config.hyde_enabled:
@@ -311,11 +318,10 @@ class RetrievalAgent:
         logger.info("Executing cross-reference expansion")
 
         articles_before = set(state.articles.keys())
-        already_fetched = set(state.articles.keys()) | state.cross_refs_fetched
 
         new_articles, fetched_refs = await self.crossref.expand_with_references(
             list(state.articles.values()),
-            already_fetched,
+            state,
             iteration_log.iteration_number,
             max_refs=10
         )
@@ -324,8 +330,6 @@ class RetrievalAgent:
         for article in new_articles:
             state.add_article(article)
 
-        state.cross_refs_fetched.update(fetched_refs)
-
         # Update iteration log
         articles_after = set(state.articles.keys())
         iteration_log.articles_retrieved = list(articles_after)
@@ -355,46 +359,104 @@ class RetrievalAgent:
                 query_embedding=embedding,
                 language="arabic",
                 limit=5,
-                similarity_threshold=self.config.min_area_similarity - 0.1
+                similarity_threshold=self.config.min_area_similarity - 0.1,
+                exclude=set(state.articles)
             )
             query_log.search_latency_ms = int((time.time() - search_start_inner) * 1000)
 
-            # Convert to ArticleResults and add to state
-            results = []
-            for article in articles:
-                article_result = ArticleResult(
-                    article_number=article.get("article_number"),
-                    text_arabic=article.get("text_arabic", ""),
-                    text_english=article.get("text_english", ""),
-                    hierarchy_path=article.get("hierarchy_path", {}),
-                    citation=article.get("citation", {}),
-                    law_id=article.get("law_id"),
-                    found_by_query=query_text[:100],
-                    found_in_iteration=iteration,
-                    similarity=article.get("similarity", 0)
-                )
+            results = self._ingest_results(articles, query_text, state, query_log, iteration)
+            query_log.total_latency_ms = int((time.time() - search_start) * 1000)
+            return results
+
+        except LLMUnavailableError as e:
+            logger.warning(f"LLM unavailable, skipping search: {e}")
+            query_log.total_latency_ms = int((time.time() - search_start) * 1000)
+            return []
+        except Exception as e:
+            logger.error(f"Search failed: {e}")
+            query_log.total_latency_ms = int((time.time() - search_start) * 1000)
+            return []
 
-                is_new = state.add_article(article_result)
-                if is_new:
-                    results.append(article_result)
+    async def _search_batch_with_embeddings(
+        self,
+        query_texts: list[str],
+        state: RetrievalState,
+        query_logs: list[QueryLog],
+        iteration: int
+    ) -> list[ArticleResult]:
+        """Execute several semantic searches with one embedding batch and one RPC."""
+        if not query_texts:
+            return []
 
-                query_log.articles_found.append(article_result.article_number)
-                query_log.similarities.append(article_result.similarity)
+        search_start = time.time()
 
-            query_log.total_latency_ms = int((time.time() - search_start) * 1000)
+        try:
+            # Generate all embeddings in one batch
+            embed_start = time.time()
+            embeddings = await self.llm.get_embeddings(query_texts)
+            embedding_latency_ms = int((time.time() - embed_start) * 1000)
 
-            logger.info(
-                f"Search returned {len(articles)} articles, "
-                f"{len(results)} new (max sim: {max(query_log.similarities) if query_log.similarities else 0:.2%})"
+            # Search in Supabase with a single round-trip
+            search_start_inner = time.time()
+            batch_articles = await asyncio.to_thread(
+                self.supabase.semantic_search_batch,
+                query_embeddings=embeddings,
+                language="arabic",
+                limit=5,
+                similarity_threshold=self.config.min_area_similarity - 0.1,
+                exclude=set(state.articles)
             )
+            search_latency_ms = int((time.time() - search_start_inner) * 1000)
+
+            results = []
+            for query_text, query_log, articles in zip(query_texts, query_logs, batch_articles):
+                # Queries share the batch, so each sees the batch's wall-clock latency
+                query_log.embedding_latency_ms = embedding_latency_ms
+                query_log.search_latency_ms = search_latency_ms
+                results.extend(
+                    self._ingest_results(articles, query_text, state, query_log, iteration)
+                )
+                query_log.total_latency_ms = int((time.time() - search_start) * 1000)
 
             return results
 
+        except LLMUnavailableError as e:
+            logger.warning(f"LLM unavailable, skipping batch search: {e}")
+            for query_log in query_logs:
+                query_log.total_latency_ms = int((time.time() - search_start) * 1000)
+            return []
         except Exception as e:
-            logger.error(f"Search failed: {e}")
-            query_log.total_latency_ms = int((time.time() - search_start) * 1000)
+            logger.error(f"Batch search failed: {e}")
+            for query_log in query_logs:
+                query_log.total_latency_ms = int((time.time() - search_start) * 1000)
             return []
 
+    def _ingest_results(
+        self,
+        articles: list[dict],
+        query_text: str,
+        state: RetrievalState,
+        query_log: QueryLog,
+        iteration: int
+    ) -> list[ArticleResult]:
+        """Convert search rows to ArticleResults, add them to state, return new ones."""
+        results = state.merge_results(articles, query_text, iteration)
+
+        query_log.articles_found = np.fromiter(
+            (a.get("article_number") for a in articles), dtype=np.int32, count=len(articles)
+        )
+        query_log.similarities = np.fromiter(
+            (a.get("similarity", 0) for a in articles), dtype=np.float32, count=len(articles)
+        )
+
+        max_sim = float(query_log.similarities.max()) if query_log.similarities.size else 0
+        logger.info(
+            f"Search returned {len(articles)} articles, "
+            f"{len(results)} new (max sim: {max_sim:.2%})"
+        )
+
+        return results
+
     def _check_end_conditions(
         self,
         state: RetrievalState,
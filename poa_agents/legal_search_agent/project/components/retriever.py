@@ -3,10 +3,13 @@ Retriever Component - RAG search for relevant legal articles.
 """
 import os
 import asyncio
+import heapq
 from typing import TYPE_CHECKING
 
 from agentex.lib.utils.logging import make_logger
 
+from project.llm_client import LLMUnavailableError
+
 if TYPE_CHECKING:
     from project.llm_client import LegalSearchLLMClient
     from project.supabase_client import LegalSearchSupabaseClient
@@ -73,6 +76,10 @@ class ArticleRetriever:
 
                 logger.info(f"Found {len(articles)} articles for query")
 
+            except LLMUnavailableError as e:
+                # Remaining queries would fail the same way
+                logger.warning(f"LLM unavailable, stopping search: {e}")
+                break
             except Exception as e:
                 logger.error(f"Search failed for query '{query[:50]}...': {e}")
                 continue
@@ -85,12 +92,12 @@ class ArticleRetriever:
             if not existing or article.get("similarity", 0) > existing.get("similarity", 0):
                 article_map[art_num] = article
 
-        # Sort by similarity (highest first)
-        unique_articles = list(article_map.values())
-        unique_articles.sort(key=lambda x: x.get("similarity", 0), reverse=True)
-
-        # Limit to max articles
-        return unique_articles[:self.max_articles]
+        # Top max_articles by similarity (highest first)
+        return heapq.nlargest(
+            self.max_articles,
+            article_map.values(),
+            key=lambda x: x.get("similarity", 0)
+        )
 
     async def search_direct(
         self,
@@ -120,6 +127,9 @@ class ArticleRetriever:
 
             return articles
 
+        except LLMUnavailableError as e:
+            logger.warning(f"LLM unavailable, skipping direct search: {e}")
+            return []
         except Exception as e:
             logger.error(f"Direct search failed: {e}")
             return []
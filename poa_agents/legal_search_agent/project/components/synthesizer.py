@@ -1,11 +1,16 @@
 """
 Synthesizer Component - Generates legal opinion from evidence.
 """
+import asyncio
 import json
 from typing import TYPE_CHECKING
 
 from agentex.lib.utils.logging import make_logger
 
+from project.components._formatters import format_articles, format_issue_evidence
+from project.components._prompt_runtime import build, compile_template, dumps_compact
+from project.llm_client import LLMUnavailableError
+
 if TYPE_CHECKING:
     from project.llm_client import LegalSearchLLMClient
 
@@ -260,11 +265,41 @@ Important instructions:
 Return ONLY a JSON object."""
 
 
+# Pre-split once at import so building a prompt is a single str.join
+SYNTHESIS_PROMPT_FIELDS = ("legal_brief", "issues", "articles", "issue_evidence")
+SYNTHESIS_PROMPT_SEGMENTS_AR = compile_template(SYNTHESIS_PROMPT_TEMPLATE_AR, SYNTHESIS_PROMPT_FIELDS)
+SYNTHESIS_PROMPT_SEGMENTS_EN = compile_template(SYNTHESIS_PROMPT_TEMPLATE_EN, SYNTHESIS_PROMPT_FIELDS)
+
+
+# Severity ordering used when merging per-issue opinions (higher wins)
+FINDING_SEVERITY = {
+    "VALID": 0,
+    "VALID_WITH_CONDITIONS": 1,
+    "INCONCLUSIVE": 2,
+    "REQUIRES_REVIEW": 3,
+    "INVALID": 4,
+}
+
+DECISION_SEVERITY = {
+    "valid": 0,
+    "valid_with_remediations": 1,
+    "needs_review": 2,
+    "invalid": 3,
+}
+
+# Cap on concurrent per-issue LLM calls to stay within provider rate limits
+MAX_CONCURRENT_ISSUE_CALLS = 8
+
+# Fewer issues than this are synthesized in one combined call
+PER_ISSUE_MIN_ISSUES = 2
+
+
 class Synthesizer:
     """Synthesizes legal opinion from Legal Brief and retrieved evidence."""
 
     def __init__(self, llm_client: "LegalSearchLLMClient"):
         self.llm = llm_client
+        self._issue_semaphore = asyncio.Semaphore(MAX_CONCURRENT_ISSUE_CALLS)
 
     async def synthesize(
         self,
@@ -287,41 +322,115 @@ class Synthesizer:
         Returns:
             Legal opinion dict
         """
-        # Select prompts based on locale
-        system_prompt = SYNTHESIS_SYSTEM_PROMPT_EN if locale == "en" else SYNTHESIS_SYSTEM_PROMPT_AR
-        prompt_template = SYNTHESIS_PROMPT_TEMPLATE_EN if locale == "en" else SYNTHESIS_PROMPT_TEMPLATE_AR
+        system_prompt, prompt = self._render_prompt(
+            legal_brief, issues, issue_evidence, all_articles, locale
+        )
 
-        # Format articles for prompt
-        articles_text = self._format_articles(all_articles)
-        evidence_text = self._format_issue_evidence(issue_evidence)
-
-        prompt = prompt_template.format(
-            legal_brief=json.dumps(legal_brief, ensure_ascii=False, indent=2),
-            issues=json.dumps(issues, ensure_ascii=False, indent=2),
-            articles=articles_text,
-            issue_evidence=evidence_text
+        logger.info("Calling LLM to synthesize legal opinion (locale=%s)...", locale)
+
+        try:
+            response = await self.llm.chat(
+                user_message=prompt,
+                system_message=system_prompt,
+                temperature=0.2,
+                max_tokens=4000,
+                response_format={"type": "json_object"}
+            )
+        except LLMUnavailableError:
+            logger.error("LLM circuit open - returning degraded opinion")
+            return self._degraded_opinion("LLM provider unavailable.", all_articles)
+
+        return self._parse_opinion(response, all_articles)
+
+    async def synthesize_per_issue(
+        self,
+        legal_brief: dict,
+        issues: list[dict],
+        issue_evidence: dict[str, list[dict]],
+        all_articles: list[dict],
+        locale: str = "ar"
+    ) -> dict:
+        """
+        Synthesize a legal opinion with one concurrent LLM call per issue.
+
+        Each issue is analyzed with only its own evidence, then the
+        per-issue opinions are merged into a single opinion in Python.
+        Wall-clock time is roughly the slowest issue rather than the sum.
+
+        Args:
+            legal_brief: The Legal Brief
+            issues: List of legal issues analyzed
+            issue_evidence: Map of issue_id -> relevant articles
+            all_articles: All unique articles retrieved
+            locale: Language locale ("ar" or "en") - defaults to "ar"
+
+        Returns:
+            Legal opinion dict
+        """
+        if len(issues) < PER_ISSUE_MIN_ISSUES:
+            return await self.synthesize(
+                legal_brief, issues, issue_evidence, all_articles, locale
+            )
+
+        async def analyze_issue(issue: dict) -> dict:
+            issue_id = issue.get("issue_id", "unknown")
+            evidence = issue_evidence.get(issue_id, [])
+            system_prompt, prompt = self._render_prompt(
+                legal_brief, [issue], {issue_id: evidence}, evidence, locale
+            )
+            try:
+                async with self._issue_semaphore:
+                    response = await self.llm.chat(
+                        user_message=prompt,
+                        system_message=system_prompt,
+                        temperature=0.2,
+                        max_tokens=2000,
+                        response_format={"type": "json_object"}
+                    )
+            except LLMUnavailableError:
+                logger.error("LLM circuit open - degraded opinion for %s", issue_id)
+                return self._degraded_opinion("LLM provider unavailable.", evidence)
+            return self._parse_opinion(response, evidence)
+
+        logger.info(
+            "Calling LLM to synthesize %d issues concurrently (locale=%s)...", len(issues), locale
         )
 
-        logger.info(f"Calling LLM to synthesize legal opinion (locale={locale})...")
+        issue_opinions = await asyncio.gather(*[analyze_issue(issue) for issue in issues])
+
+        return self._merge_issue_opinions(issue_opinions, all_articles)
 
-        response = await self.llm.chat(
-            user_message=prompt,
-            system_message=system_prompt,
-            temperature=0.2,
-            max_tokens=4000
+    def _render_prompt(
+        self,
+        legal_brief: dict,
+        issues: list[dict],
+        issue_evidence: dict[str, list[dict]],
+        articles: list[dict],
+        locale: str
+    ) -> tuple[str, str]:
+        """Build the (system prompt, user prompt) pair for a synthesis call."""
+        # Select prompts based on locale
+        system_prompt = SYNTHESIS_SYSTEM_PROMPT_EN if locale == "en" else SYNTHESIS_SYSTEM_PROMPT_AR
+        prompt_segments = SYNTHESIS_PROMPT_SEGMENTS_EN if locale == "en" else SYNTHESIS_PROMPT_SEGMENTS_AR
+
+        # Format articles for prompt
+        articles_text = format_articles(articles, locale=locale)
+        evidence_text = format_issue_evidence(issue_evidence)
+
+        prompt = build(
+            prompt_segments,
+            dumps_compact(legal_brief),
+            dumps_compact(issues),
+            articles_text,
+            evidence_text
         )
+        return system_prompt, prompt
 
-        # Parse response
+    def _parse_opinion(self, response: str, all_articles: list[dict]) -> dict:
+        """Parse the LLM response into an opinion dict, with a degraded fallback."""
         try:
-            clean_response = response.strip()
-            if clean_response.startswith("```"):
-                clean_response = clean_response.split("```")[1]
-                if clean_response.startswith("json"):
-                    clean_response = clean_response[4:]
-            if clean_response.endswith("```"):
-                clean_response = clean_response[:-3]
-
-            opinion = json.loads(clean_response.strip())
+            # JSON mode guarantees a raw JSON object, no markdown fences
+            opinion = json.loads(response.strip())
 
             # Validate and set defaults
             opinion.setdefault("overall_finding", "INCONCLUSIVE")
@@ -337,67 +446,95 @@ class Synthesizer:
             return opinion
 
         except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse synthesis response: {e}")
-            # Return a basic opinion
-            return {
-                "overall_finding": "INCONCLUSIVE",
-                "confidence_score": 0.3,
-                "confidence_level": "LOW",
-                "decision_bucket": "needs_review",
-                "opinion_summary_en": "Unable to synthesize opinion. Raw analysis: " + response[:500],
-                "detailed_analysis": response,
-                "findings": [],
-                "concerns": ["Synthesis failed - manual review required"],
-                "recommendations": ["Please review the case manually"],
-                "all_citations": all_articles,
-                "grounding_score": 0.0
-            }
-
-    def _format_articles(self, articles: list[dict]) -> str:
-        """Format articles for the prompt, preferring Arabic text."""
-        if not articles:
-            return "لم يتم العثور على مواد ذات صلة."
-
-        lines = []
-        for art in articles:
-            # Use citation info if available (from poa_articles table)
-            citation = art.get("citation", {})
-            if citation and citation.get("formatted_ar"):
-                lines.append(f"### {citation.get('formatted_ar')}")
-            else:
-                lines.append(f"### مادة {art.get('article_number', '?')}")
-                if art.get("law_name"):
-                    lines.append(f"القانون: {art.get('law_name')}")
-                elif citation.get("law_name_ar"):
-                    lines.append(f"القانون: {citation.get('law_name_ar')}")
-
-            text_ar = art.get("text_arabic") or art.get("text_ar", "")
-            text_en = art.get("text_english") or art.get("text_en", "")
-
-            # Prefer Arabic text; fall back to English
-            if text_ar:
-                lines.append(f"النص: {text_ar}")
-            elif text_en:
-                lines.append(f"النص (إنجليزي - يرجى ترجمته للعربية في المخرجات): {text_en}")
-
-            lines.append(f"التشابه: {art.get('similarity', 0):.0%}")
-            lines.append("")
-
-        return "\n".join(lines)
-
-    def _format_issue_evidence(self, issue_evidence: dict[str, list[dict]]) -> str:
-        """Format issue evidence for the prompt."""
-        lines = []
-        for issue_id, articles in issue_evidence.items():
-            lines.append(f"### {issue_id}")
-            if articles:
-                for art in articles:
-                    lines.append(f"- مادة {art.get('article_number')}: {art.get('similarity', 0):.0%}")
-            else:
-                lines.append("- لم يتم العثور على مواد ذات صلة")
-            lines.append("")
-
-        return "\n".join(lines)
+            logger.error("Failed to parse synthesis response: %s", e)
+            return self._degraded_opinion(response, all_articles)
+
+    def _degraded_opinion(self, raw_analysis: str, all_articles: list[dict]) -> dict:
+        """Basic opinion returned when synthesis fails; flags the case for review."""
+        return {
+            "overall_finding": "INCONCLUSIVE",
+            "confidence_score": 0.3,
+            "confidence_level": "LOW",
+            "decision_bucket": "needs_review",
+            "opinion_summary_en": "Unable to synthesize opinion. Raw analysis: " + raw_analysis[:500],
+            "detailed_analysis": raw_analysis,
+            "findings": [],
+            "concerns": ["Synthesis failed - manual review required"],
+            "recommendations": ["Please review the case manually"],
+            "all_citations": all_articles,
+            "grounding_score": 0.0
+        }
+
+    def _merge_issue_opinions(self, issue_opinions: list[dict], all_articles: list[dict]) -> dict:
+        """Reduce per-issue opinions into one opinion; the most severe finding wins."""
+        overall_finding = max(
+            (op.get("overall_finding", "INCONCLUSIVE") for op in issue_opinions),
+            key=lambda f: FINDING_SEVERITY.get(f, FINDING_SEVERITY["INCONCLUSIVE"])
+        )
+        decision_bucket = max(
+            (op.get("decision_bucket", "needs_review") for op in issue_opinions),
+            key=lambda b: DECISION_SEVERITY.get(b, DECISION_SEVERITY["needs_review"])
+        )
+        confidence_score = sum(
+            float(op.get("confidence_score", 0.5)) for op in issue_opinions
+        ) / len(issue_opinions)
+        if confidence_score >= 0.8:
+            confidence_level = "HIGH"
+        elif confidence_score >= 0.5:
+            confidence_level = "MEDIUM"
+        else:
+            confidence_level = "LOW"
+
+        issue_analyses = []
+        syntheses = []
+        conclusions = []
+        citations = []
+        findings = []
+        for op in issue_opinions:
+            analysis = op.get("detailed_analysis")
+            if isinstance(analysis, dict):
+                issue_analyses.extend(analysis.get("issue_by_issue_analysis", []))
+                if analysis.get("synthesis"):
+                    syntheses.append(analysis["synthesis"])
+                if analysis.get("conclusion"):
+                    conclusions.append(analysis["conclusion"])
+            citations.extend(op.get("citations", []))
+            findings.extend(op.get("findings", []))
+
+        # Renumber citations so IDs stay unique across issues
+        for i, citation in enumerate(citations, start=1):
+            citation["citation_id"] = f"C{i}"
+
+        first = issue_opinions[0]
+        first_analysis = first.get("detailed_analysis")
+        opinion = {
+            "case_summary": first.get("case_summary", {}),
+            "overall_finding": overall_finding,
+            "confidence_score": round(confidence_score, 2),
+            "confidence_level": confidence_level,
+            "decision_bucket": decision_bucket,
+            "opinion_summary_en": "\n\n".join(
+                op["opinion_summary_en"] for op in issue_opinions if op.get("opinion_summary_en")
+            ),
+            "opinion_summary_ar": "\n\n".join(
+                op["opinion_summary_ar"] for op in issue_opinions if op.get("opinion_summary_ar")
+            ),
+            "detailed_analysis": {
+                "introduction": first_analysis.get("introduction", "") if isinstance(first_analysis, dict) else "",
+                "issue_by_issue_analysis": issue_analyses,
+                "synthesis": "\n\n".join(syntheses),
+                "conclusion": "\n\n".join(conclusions),
+            },
+            "citations": citations,
+            "findings": findings,
+            # dict.fromkeys de-duplicates while keeping first-seen order
+            "concerns": list(dict.fromkeys(c for op in issue_opinions for c in op.get("concerns", []))),
+            "recommendations": list(dict.fromkeys(r for op in issue_opinions for r in op.get("recommendations", []))),
+            "conditions": list(dict.fromkeys(c for op in issue_opinions for c in op.get("conditions", []))),
+            "all_citations": all_articles,
+        }
+        opinion["grounding_score"] = self._calculate_grounding(opinion)
+        return opinion
 
     def _calculate_grounding(self, opinion: dict) -> float:
         """Calculate grounding score based on citations."""
@@ -405,9 +542,6 @@ class Synthesizer:
         if not findings:
             return 0.0
 
-        grounded_findings = sum(
-            1 for f in findings
-            if f.get("supporting_articles")
-        )
+        grounded_findings = len([f for f in findings if f.get("supporting_articles")])
 
-        return grounded_findings / len(findings) if findings else 0.0
+        return grounded_findings / len(findings)
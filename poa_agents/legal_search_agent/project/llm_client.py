@@ -1,16 +1,131 @@
 """OpenAI LLM client for the Legal Search Agent."""
+import asyncio
+import hashlib
+import logging
 import os
+import threading
+from itertools import islice
 from typing import Optional
 
+import httpx
+import lmdb
+import numpy as np
+import openai
+import pybreaker
 from openai import AsyncOpenAI
+from tenacity import (
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_random_exponential,
+)
 from agentex.lib.utils.logging import make_logger
 
 logger = make_logger(__name__)
 
+# Texts per embeddings request; keeps typical article batches under the
+# per-request token limit
+EMBEDDING_BATCH_SIZE = 96
+
+# Bounded exponential backoff with jitter for transient OpenAI failures
+_openai_retry = retry(
+    retry=retry_if_exception_type((
+        openai.RateLimitError,
+        openai.APIConnectionError,
+        openai.APITimeoutError,
+        openai.InternalServerError,
+    )),
+    wait=wait_random_exponential(multiplier=1, max=30),
+    stop=stop_after_attempt(5),
+    reraise=True,
+)
+
+# Errors caused by the request itself rather than an OpenAI outage; they
+# don't count towards opening the circuit breaker
+_NON_TRANSIENT_ERRORS = [
+    openai.BadRequestError,
+    openai.AuthenticationError,
+    openai.PermissionDeniedError,
+    openai.NotFoundError,
+    openai.UnprocessableEntityError,
+    ValueError,
+]
+
+
+class LLMUnavailableError(Exception):
+    """Raised instead of calling OpenAI while the circuit breaker is open."""
+
+
+# On-disk embedding cache shared by every LegalSearchLLMClient. LMDB allows
+# one open environment per path per process, so it is opened once here.
+_embedding_cache: Optional["lmdb.Environment"] = None
+_embedding_cache_opened = False
+_embedding_cache_lock = threading.Lock()
+
+
+def _get_embedding_cache() -> Optional["lmdb.Environment"]:
+    """
+    Return the process-wide embedding cache, opening it on first use.
+
+    Embeddings are deterministic for a given (model, dimensions, text), so
+    they are persisted across restarts. Caching is disabled (None) if the
+    cache directory cannot be opened.
+    """
+    global _embedding_cache, _embedding_cache_opened
+    with _embedding_cache_lock:
+        if not _embedding_cache_opened:
+            _embedding_cache_opened = True
+            cache_dir = os.getenv("EMBEDDING_CACHE_DIR", "/var/cache/legal_emb")
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                _embedding_cache = lmdb.open(cache_dir, map_size=2**34)
+                logger.info("LegalSearchLLMClient - Embedding cache: %s", cache_dir)
+            except (OSError, lmdb.Error) as e:
+                logger.warning("Embedding cache disabled (%s): %s", cache_dir, e)
+        return _embedding_cache
+
+
+# One HTTP/2 connection pool shared by every LegalSearchLLMClient in the
+# process, so concurrent chat/embedding calls multiplex over warm connections.
+_shared_http_client: Optional[httpx.AsyncClient] = None
+_shared_http_client_refs = 0
+
+
+def _acquire_http_client() -> httpx.AsyncClient:
+    """Return the shared httpx client, creating it on first use."""
+    global _shared_http_client, _shared_http_client_refs
+    if _shared_http_client is None or _shared_http_client.is_closed:
+        _shared_http_client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=100),
+            timeout=60.0,
+        )
+        _shared_http_client_refs = 0
+    _shared_http_client_refs += 1
+    return _shared_http_client
+
+
+async def _release_http_client() -> None:
+    """Drop one reference to the shared httpx client, closing it with the last one."""
+    global _shared_http_client, _shared_http_client_refs
+    if _shared_http_client is None:
+        return
+    _shared_http_client_refs -= 1
+    if _shared_http_client_refs <= 0:
+        await _shared_http_client.aclose()
+        _shared_http_client = None
+        _shared_http_client_refs = 0
+
 
 class LegalSearchLLMClient:
     """OpenAI client for legal research and synthesis."""
 
+    # Shared by all instances: once OpenAI is failing persistently, calls fail
+    # fast with LLMUnavailableError instead of queueing retries.
+    breaker = pybreaker.CircuitBreaker(
+        fail_max=20, reset_timeout=60, exclude=_NON_TRANSIENT_ERRORS
+    )
+
     def __init__(self):
         """Initialize the OpenAI client."""
         self.model = os.getenv("LLM_MODEL", "gpt-4o-mini")
@@ -18,14 +133,81 @@ class LegalSearchLLMClient:
         self.embedding_dimensions = int(os.getenv("EMBEDDING_DIMENSIONS", "1536"))
         api_key = os.getenv("OPENAI_API_KEY")
 
-        logger.info(f"LegalSearchLLMClient - Model: {self.model}")
-        logger.info(f"LegalSearchLLMClient - Embedding Model: {self.embedding_model}")
-        logger.info(f"LegalSearchLLMClient - Embedding Dimensions: {self.embedding_dimensions}")
+        logger.info("LegalSearchLLMClient - Model: %s", self.model)
+        logger.info("LegalSearchLLMClient - Embedding Model: %s", self.embedding_model)
+        logger.info("LegalSearchLLMClient - Embedding Dimensions: %d", self.embedding_dimensions)
 
         if not api_key:
             raise ValueError("OPENAI_API_KEY must be set in environment variables")
 
-        self.client = AsyncOpenAI(api_key=api_key)
+        self.client = AsyncOpenAI(api_key=api_key, http_client=_acquire_http_client())
+        self._closed = False
+        self._emb_cache = _get_embedding_cache()
+
+    def _embedding_cache_key(self, text: str, model: str) -> bytes:
+        """Cache key for an embedding: sha256 of model, dimensions, storage dtype and text."""
+        # The dtype tag keeps entries written in another precision from being misread
+        return hashlib.sha256(
+            f"{model}|{self.embedding_dimensions}|f32|{text}".encode()
+        ).digest()
+
+    def _cache_get_many(self, keys: list[bytes]) -> list[Optional[list[float]]]:
+        """
+        Look up cached embeddings (stored as float32) in one read transaction.
+
+        Blocking disk I/O; call it off the event loop.
+        """
+        if self._emb_cache is None:
+            return [None] * len(keys)
+        with self._emb_cache.begin() as txn:
+            values = [txn.get(key) for key in keys]
+        return [
+            None if value is None
+            else np.frombuffer(value, dtype=np.float32).tolist()
+            for value in values
+        ]
+
+    def _cache_put_many(self, items: list[tuple[bytes, list[float]]]) -> None:
+        """
+        Store embeddings as float32 bytes in one write transaction.
+
+        Blocking disk I/O; call it off the event loop.
+        """
+        if self._emb_cache is None:
+            return
+        with self._emb_cache.begin(write=True) as txn:
+            for key, embedding in items:
+                txn.put(key, np.asarray(embedding, dtype=np.float32).tobytes())
+
+    async def _guarded(self, request, *args, **kwargs):
+        """
+        Run a retried OpenAI request through the circuit breaker.
+
+        The breaker sees one outcome per call, after retries are exhausted,
+        and an open circuit surfaces as LLMUnavailableError.
+        """
+        try:
+            with self.breaker.calling():
+                return await request(*args, **kwargs)
+        except pybreaker.CircuitBreakerError as e:
+            raise LLMUnavailableError(f"OpenAI unavailable: {e}") from e
+
+    @_openai_retry
+    async def _create_chat_completion(self, **kwargs):
+        """Create a chat completion, retrying transient failures."""
+        return await self.client.chat.completions.create(**kwargs)
+
+    @_openai_retry
+    async def _create_embeddings(self, model: str, inputs: list[list[str]]) -> list:
+        """Embed several input batches concurrently, retrying transient failures."""
+        return await asyncio.gather(*[
+            self.client.embeddings.create(
+                model=model,
+                input=batch,
+                dimensions=self.embedding_dimensions,
+            )
+            for batch in inputs
+        ])
 
     async def chat(
         self,
@@ -33,6 +215,7 @@ class LegalSearchLLMClient:
         system_message: Optional[str] = None,
         temperature: float = 0.3,
         max_tokens: int = 4000,
+        response_format: Optional[dict] = None,
     ) -> str:
         """
         Send a chat message and return the response.
@@ -42,32 +225,42 @@ class LegalSearchLLMClient:
             system_message: Optional system message
             temperature: Sampling temperature
             max_tokens: Maximum tokens in response
+            response_format: Optional response format, e.g. {"type": "json_object"}
 
         Returns:
             The assistant's response text
+
+        Raises:
+            LLMUnavailableError: If the circuit breaker is open
         """
         messages = []
         if system_message:
             messages.append({"role": "system", "content": system_message})
         messages.append({"role": "user", "content": user_message})
 
-        logger.debug(f"Making LLM call - model: {self.model}")
+        logger.debug("Making LLM call - model: %s", self.model)
+
+        kwargs = {}
+        if response_format is not None:
+            kwargs["response_format"] = response_format
 
         try:
-            response = await self.client.chat.completions.create(
+            response = await self._guarded(
+                self._create_chat_completion,
                 model=self.model,
                 messages=messages,
                 temperature=temperature,
                 max_tokens=max_tokens,
+                **kwargs,
             )
 
             content = response.choices[0].message.content
-            logger.debug(f"LLM response: {len(content)} characters")
+            logger.debug("LLM response: %d characters", len(content))
 
             return content or ""
 
         except Exception as e:
-            logger.error(f"LLM API request failed: {e}")
+            logger.error("LLM API request failed: %s", e)
             raise
 
     async def get_embedding(self, text: str, model: Optional[str] = None) -> list[float]:
@@ -81,27 +274,81 @@ class LegalSearchLLMClient:
         Returns:
             Embedding vector (1536 dimensions)
         """
+        # Slicing long Arabic text allocates, so only do it when it will be logged
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Generating embedding for: %s...", text[:100])
+
+        return (await self.get_embeddings([text], model=model))[0]
+
+    async def get_embeddings(
+        self,
+        texts: list[str],
+        model: Optional[str] = None
+    ) -> list[list[float]]:
+        """
+        Generate embeddings for many texts in batched, concurrent requests.
+
+        Cache hits are served locally; misses are split into chunks of
+        EMBEDDING_BATCH_SIZE texts and the chunks are embedded concurrently.
+
+        Args:
+            texts: The texts to embed
+            model: Optional model override
+
+        Returns:
+            Embedding vectors in the same order as texts
+
+        Raises:
+            LLMUnavailableError: If the circuit breaker is open
+        """
         if model is None:
             model = self.embedding_model
 
-        logger.debug(f"Generating embedding for: {text[:100]}...")
+        keys = [self._embedding_cache_key(text, model) for text in texts]
+        embeddings: list[Optional[list[float]]] = await asyncio.to_thread(self._cache_get_many, keys)
+        missing = iter([i for i, emb in enumerate(embeddings) if emb is None])
+        chunks = list(iter(lambda: list(islice(missing, EMBEDDING_BATCH_SIZE)), []))
+
+        if not chunks:
+            logger.debug("Embedding cache hit for all %d texts", len(texts))
+            return embeddings
 
         try:
-            response = await self.client.embeddings.create(
-                model=model,
-                input=text,
-                dimensions=self.embedding_dimensions,
+            responses = await self._guarded(
+                self._create_embeddings,
+                model,
+                [[texts[i] for i in chunk] for chunk in chunks],
             )
 
-            embedding = response.data[0].embedding
-            logger.debug(f"Generated embedding: {len(embedding)} dimensions")
+            # Embeddings come back in the order they were submitted. They are
+            # rounded to float32 as stored, so a cache hit returns the same values
+            fetched = []
+            for chunk, response in zip(chunks, responses):
+                for i, item in zip(chunk, response.data):
+                    embeddings[i] = np.asarray(item.embedding, dtype=np.float32).tolist()
+                    fetched.append((keys[i], embeddings[i]))
+            await asyncio.to_thread(self._cache_put_many, fetched)
+
+            logger.debug(
+                "Generated %d embeddings in %d requests",
+                sum(len(chunk) for chunk in chunks), len(chunks)
+            )
 
-            return embedding
+            return embeddings
 
         except Exception as e:
-            logger.error(f"Failed to generate embedding: {e}")
+            logger.error("Failed to generate embeddings: %s", e)
             raise
 
     async def close(self):
-        """Close the client connection."""
-        await self.client.close()
+        """
+        Release this client's hold on the shared connection pool.
+
+        The pool itself is only closed once every client has been closed; the
+        embedding cache stays open for the life of the process.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._emb_cache = None
+        await _release_http_client()
@@ -0,0 +1,120 @@
+"""
+Local in-memory mirror of poa_articles embeddings.
+
+Used as a degraded-mode search when the match_poa_articles RPC fails, so
+fallback results are still ranked by true cosine similarity. The mirror is
+built from Supabase once and persisted to disk for later starts.
+"""
+import os
+from typing import Optional
+
+import numpy as np
+import orjson
+from agentex.lib.utils.logging import make_logger
+
+from project.supabase_client import ARTICLE_COLUMNS, PAGE_SIZE
+
+logger = make_logger(__name__)
+
+
+def _unit_rows(vectors: list, dimensions: int) -> np.ndarray:
+    """Stack pgvector values into an L2-normalized matrix (zero rows for missing)."""
+    matrix = np.zeros((len(vectors), dimensions), dtype=np.float32)
+    for i, vec in enumerate(vectors):
+        if vec is None:
+            continue
+        matrix[i] = orjson.loads(vec) if isinstance(vec, str) else vec
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+class LocalArticleIndex:
+    """Brute-force cosine index over the active poa_articles rows."""
+
+    def __init__(self, articles: list[dict], arabic: np.ndarray, english: np.ndarray):
+        """
+        Args:
+            articles: Article rows (ARTICLE_COLUMNS), aligned with the matrices
+            arabic: Unit arabic_embedding rows
+            english: Unit embedding rows
+        """
+        self.articles = articles
+        self.arabic = arabic
+        self.english = english
+
+    def search(self, query_embedding: list[float], language: str, limit: int) -> list[dict]:
+        """Return the top `limit` articles by cosine similarity, with similarity set."""
+        matrix = self.arabic if language == "arabic" else self.english
+        if not len(self.articles):
+            return []
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        scores = matrix @ query
+        k = min(limit, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {**self.articles[i], "similarity": float(scores[i])}
+            for i in top
+            if scores[i] > 0
+        ]
+
+    @classmethod
+    def build(cls, client, dimensions: int = 1536) -> "LocalArticleIndex":
+        """Page through active poa_articles and build the index."""
+        rows: list[dict] = []
+        start = 0
+        while True:
+            response = (
+                client.table("poa_articles")
+                .select(f"{ARTICLE_COLUMNS}, arabic_embedding, embedding")
+                .eq("is_active", True)
+                .order("id")
+                .range(start, start + PAGE_SIZE - 1)
+                .execute()
+            )
+            page = response.data or []
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                break
+            start += PAGE_SIZE
+
+        arabic = _unit_rows([r.pop("arabic_embedding", None) for r in rows], dimensions)
+        english = _unit_rows([r.pop("embedding", None) for r in rows], dimensions)
+        logger.info(f"Built local article index with {len(rows)} articles")
+        return cls(rows, arabic, english)
+
+    def save(self, path: str) -> None:
+        """Persist the index to a directory."""
+        os.makedirs(path, exist_ok=True)
+        np.savez(os.path.join(path, "embeddings.npz"), arabic=self.arabic, english=self.english)
+        with open(os.path.join(path, "articles.json"), "wb") as f:
+            f.write(orjson.dumps(self.articles))
+
+    @classmethod
+    def load(cls, path: str) -> Optional["LocalArticleIndex"]:
+        """Load a persisted index, or None if there is none."""
+        try:
+            with np.load(os.path.join(path, "embeddings.npz")) as data:
+                arabic, english = data["arabic"], data["english"]
+            with open(os.path.join(path, "articles.json"), "rb") as f:
+                articles = orjson.loads(f.read())
+        except (OSError, ValueError, KeyError):
+            return None
+        logger.info(f"Loaded local article index with {len(articles)} articles from {path}")
+        return cls(articles, arabic, english)
+
+    @classmethod
+    def load_or_build(cls, client, path: str, dimensions: int = 1536) -> "LocalArticleIndex":
+        """Load the persisted index, building and saving it on first use."""
+        index = cls.load(path)
+        if index is None:
+            index = cls.build(client, dimensions)
+            try:
+                index.save(path)
+            except OSError as e:
+                logger.warning(f"Could not persist local article index to {path}: {e}")
+        return index
@@ -6,9 +6,16 @@ evaluation artifacts for analysis.
 """
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional, Literal
+from itertools import islice
+from operator import attrgetter
+from typing import IO, Iterable, Optional, Literal
 from enum import Enum
 
+import numpy as np
+import orjson
+from sortedcontainers import SortedKeyList
+from xxhash import xxh64_intdigest
+
 
 class IterationPurpose(str, Enum):
     """Purpose of each iteration in the agentic loop."""
@@ -56,7 +63,7 @@ class RetrievalConfig:
     save_artifacts: bool = True
 
 
-@dataclass
+@dataclass(slots=True)
 class QueryLog:
     """Log for a single query execution."""
     query_id: str
@@ -67,9 +74,9 @@ class QueryLog:
     # HyDE specific
     hypothetical_generated: Optional[str] = None
 
-    # Results
-    articles_found: list[int] = field(default_factory=list)
-    similarities: list[float] = field(default_factory=list)
+    # Results (parallel arrays, one entry per search hit)
+    articles_found: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int32))
+    similarities: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float32))
 
     # Timing
     hyde_latency_ms: int = 0
@@ -78,7 +85,7 @@ class QueryLog:
     total_latency_ms: int = 0
 
 
-@dataclass
+@dataclass(slots=True)
 class ArticleResult:
     """An article with retrieval metadata."""
     article_number: int
@@ -103,7 +110,12 @@ class ArticleResult:
     matched_legal_areas: list[str] = field(default_factory=list)
 
 
-@dataclass
+def _similarity_desc(article: ArticleResult) -> float:
+    """Sort key ordering articles by descending similarity."""
+    return -article.similarity
+
+
+@dataclass(slots=True)
 class CoverageStatus:
     """Status of coverage for a legal area."""
     area_id: str
@@ -115,10 +127,27 @@ class CoverageStatus:
     articles_found: list[int] = field(default_factory=list)
     avg_similarity: float = 0.0
     max_similarity: float = 0.0
+    # Similarities of articles_found, set by record_similarities
+    _sims: np.ndarray = field(
+        default_factory=lambda: np.empty(0, dtype=np.float32),
+        init=False,
+        repr=False,
+        compare=False,
+    )
 
     # Status
     status: Literal["covered", "weak", "missing"] = "missing"
 
+    def record_similarities(self, similarities: np.ndarray) -> None:
+        """Store the matched articles' similarities and derive avg/max from them."""
+        self._sims = similarities
+        if similarities.size:
+            self.avg_similarity = float(similarities.mean())
+            self.max_similarity = float(similarities.max())
+        else:
+            self.avg_similarity = 0.0
+            self.max_similarity = 0.0
+
     def is_satisfied(self, min_similarity: float = 0.5) -> bool:
         """Check if this area's requirements are satisfied."""
         return (
@@ -127,7 +156,7 @@ class CoverageStatus:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class IterationLog:
     """Log for a single iteration of the retrieval loop."""
     iteration_number: int
@@ -155,7 +184,7 @@ class IterationLog:
     agent_reasoning: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class RetrievalState:
     """State maintained across iterations of the agentic loop."""
     # Identification
@@ -168,12 +197,28 @@ class RetrievalState:
 
     # Articles (article_number -> ArticleResult)
     articles: dict[int, ArticleResult] = field(default_factory=dict)
+    # Once this many search hits are held, only hits beating the weakest are
+    # kept. Cross-references carry a fixed, not a measured, similarity, so
+    # they are neither counted nor evicted.
+    max_articles: Optional[int] = None
+
+    # Same articles ordered by descending similarity, maintained by add_article
+    _by_sim: SortedKeyList = field(
+        default_factory=lambda: SortedKeyList(key=_similarity_desc),
+        init=False,
+        repr=False,
+        compare=False,
+    )
+    # Running sum of article similarities, maintained by add_article
+    _sim_sum: float = field(default=0.0, init=False, repr=False, compare=False)
+    # Number of held cross-reference articles, maintained by add_article
+    _num_cross_refs: int = field(default=0, init=False, repr=False, compare=False)
 
     # Coverage tracking
     coverage: dict[str, CoverageStatus] = field(default_factory=dict)
 
-    # Query deduplication
-    queries_tried: set[str] = field(default_factory=set)
+    # Query deduplication (64-bit hashes of query text, see seen_query/mark_query)
+    queries_tried: set[int] = field(default_factory=set)
 
     # Cross-reference tracking
     cross_refs_fetched: set[int] = field(default_factory=set)
@@ -188,36 +233,136 @@ class RetrievalState:
     stop_reason: Optional[StopReason] = None
 
     def add_article(self, article: ArticleResult) -> bool:
-        """Add an article, return True if it's new."""
+        """Add an article, return True if it's new and was kept."""
         if article.article_number in self.articles:
             # Update if higher similarity
             existing = self.articles[article.article_number]
             if article.similarity > existing.similarity:
+                self._by_sim.remove(existing)
+                self._by_sim.add(article)
+                self._sim_sum += article.similarity - existing.similarity
+                self._num_cross_refs += article.is_cross_reference - existing.is_cross_reference
                 self.articles[article.article_number] = article
             return False
+        if (
+            not article.is_cross_reference
+            and self.max_articles is not None
+            and len(self.articles) - self._num_cross_refs >= self.max_articles
+        ):
+            weakest = self._weakest_search_hit()
+            if weakest is None or article.similarity <= weakest.similarity:
+                return False
+            # Make room by dropping the weakest search hit
+            self._by_sim.remove(weakest)
+            del self.articles[weakest.article_number]
+            self._sim_sum -= weakest.similarity
         self.articles[article.article_number] = article
+        self._by_sim.add(article)
+        self._sim_sum += article.similarity
+        self._num_cross_refs += article.is_cross_reference
         return True
 
+    def _weakest_search_hit(self) -> Optional[ArticleResult]:
+        """Lowest-similarity article that is not a cross-reference, if any."""
+        for article in reversed(self._by_sim):
+            if not article.is_cross_reference:
+                return article
+        return None
+
+    def merge_results(
+        self,
+        results: list[dict],
+        query: str,
+        iteration: int
+    ) -> list[ArticleResult]:
+        """
+        Merge a batch of search rows into the state, return the new articles.
+
+        Rows that neither add a new article nor beat the similarity already
+        held are skipped without building an ArticleResult.
+        """
+        if not results:
+            return []
+        sims = np.fromiter(
+            (r.get("similarity", 0) for r in results), dtype=np.float64, count=len(results)
+        )
+        held = self.articles
+        existing = np.fromiter(
+            (held[r.get("article_number")].similarity if r.get("article_number") in held else -1.0
+             for r in results),
+            dtype=np.float64,
+            count=len(results),
+        )
+
+        new_articles = []
+        for i in np.flatnonzero(sims > existing):
+            row = results[i]
+            article = ArticleResult(
+                article_number=row.get("article_number"),
+                text_arabic=row.get("text_arabic", ""),
+                text_english=row.get("text_english", ""),
+                hierarchy_path=row.get("hierarchy_path", {}),
+                citation=row.get("citation", {}),
+                law_id=row.get("law_id"),
+                found_by_query=query[:100],
+                found_in_iteration=iteration,
+                similarity=row.get("similarity", 0)
+            )
+            if self.add_article(article):
+                new_articles.append(article)
+        return new_articles
+
+    def seen_query(self, query: str) -> bool:
+        """Check whether a query has already been tried."""
+        return xxh64_intdigest(query.encode()) in self.queries_tried
+
+    def mark_query(self, query: str) -> None:
+        """Record a query as tried."""
+        self.queries_tried.add(xxh64_intdigest(query.encode()))
+
+    def filter_new_refs(self, candidates: Iterable[int]) -> set[int]:
+        """Return the referenced article numbers not yet held, fetched or pending."""
+        return (
+            set(candidates)
+            .difference(self.articles)
+            .difference(self.cross_refs_fetched, self.cross_refs_pending)
+        )
+
     def get_articles_list(self) -> list[ArticleResult]:
         """Get all articles sorted by similarity."""
-        return sorted(
-            self.articles.values(),
-            key=lambda x: x.similarity,
-            reverse=True
-        )
+        return list(self._by_sim)
 
     def get_avg_similarity(self) -> float:
         """Get average similarity across all articles."""
-        if not self.articles:
-            return 0.0
-        return sum(a.similarity for a in self.articles.values()) / len(self.articles)
+        return self._sim_sum / len(self.articles) if self.articles else 0.0
 
     def get_top_k_similarity(self, k: int = 3) -> float:
         """Get average similarity of top-k articles."""
-        articles = self.get_articles_list()
-        if len(articles) < k:
+        if len(self._by_sim) < k:
             return self.get_avg_similarity()
-        return sum(a.similarity for a in articles[:k]) / k
+        return sum(a.similarity for a in islice(self._by_sim, k)) / k
+
+
+# RetrievalConfig fields included in RetrievalEvalArtifact.to_dict()
+_CONFIG_KEYS = ("hyde_enabled", "max_iterations", "coverage_threshold")
+_config_values = attrgetter(*_CONFIG_KEYS)
+
+# RetrievalConfig fields stored in the retrieval_eval_artifacts row
+_ROW_CONFIG_KEYS = (
+    "hyde_enabled",
+    "hyde_num_hypotheticals",
+    "max_iterations",
+    "max_articles",
+    "max_latency_ms",
+    "coverage_threshold",
+    "confidence_threshold",
+    "enable_coverage_check",
+    "enable_cross_references",
+)
+_row_config_values = attrgetter(*_ROW_CONFIG_KEYS)
+
+# Row arrays (articles_found, similarities) are numpy; orjson encodes them natively
+_ROW_JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
 
 
 @dataclass
@@ -265,41 +410,15 @@ class RetrievalEvalArtifact:
     verdict: Optional[str] = None
     verdict_confidence: Optional[float] = None
 
-    def to_dict(self) -> dict:
-        """Convert to dictionary for storage."""
+    def _summary_dict(self) -> dict:
+        """Everything in to_dict() except the per-iteration logs."""
         return {
             "artifact_id": self.artifact_id,
             "application_id": self.application_id,
             "timestamp": self.timestamp.isoformat(),
             "legal_brief": self.legal_brief,
             "decomposed_issues": self.decomposed_issues,
-            "config": {
-                "hyde_enabled": self.config.hyde_enabled,
-                "max_iterations": self.config.max_iterations,
-                "coverage_threshold": self.config.coverage_threshold,
-            },
-            "iterations": [
-                {
-                    "iteration_number": it.iteration_number,
-                    "purpose": it.purpose.value,
-                    "queries": [
-                        {
-                            "query_type": q.query_type,
-                            "query_text": q.query_text[:200],
-                            "hypothetical": q.hypothetical_generated[:200] if q.hypothetical_generated else None,
-                            "articles_found": q.articles_found,
-                            "similarities": q.similarities,
-                        }
-                        for q in it.queries
-                    ],
-                    "coverage_before": it.coverage_before,
-                    "coverage_after": it.coverage_after,
-                    "gaps_identified": it.gaps_identified,
-                    "articles_new": it.articles_new,
-                    "latency_ms": it.latency_ms,
-                }
-                for it in self.iterations
-            ],
+            "config": dict(zip(_CONFIG_KEYS, _config_values(self.config))),
             "final_articles": self.final_articles,
             "final_coverage": self.final_coverage,
             "stop_reason": self.stop_reason,
@@ -311,3 +430,119 @@ class RetrievalEvalArtifact:
             "estimated_cost_usd": self.estimated_cost_usd,
             "verdict": self.verdict,
         }
+
+    @staticmethod
+    def _iteration_dict(it: IterationLog) -> dict:
+        """Convert one iteration log for storage."""
+        return {
+            "iteration_number": it.iteration_number,
+            "purpose": it.purpose.value,
+            "queries": [
+                {
+                    "query_type": q.query_type,
+                    "query_text": q.query_text[:200],
+                    "hypothetical": q.hypothetical_generated[:200] if q.hypothetical_generated else None,
+                    "articles_found": q.articles_found.tolist(),
+                    "similarities": q.similarities.tolist(),
+                }
+                for q in it.queries
+            ],
+            "coverage_before": it.coverage_before,
+            "coverage_after": it.coverage_after,
+            "gaps_identified": it.gaps_identified,
+            "articles_new": it.articles_new,
+            "latency_ms": it.latency_ms,
+        }
+
+    def to_dict(self) -> dict:
+        """Convert to dictionary for storage."""
+        return {
+            **self._summary_dict(),
+            "iterations": [self._iteration_dict(it) for it in self.iterations],
+        }
+
+    def _row_summary(self) -> dict:
+        """Everything in the retrieval_eval_artifacts row except the iterations."""
+        # Only use application_id if it's a valid UUID (not placeholder values)
+        app_id = self.application_id
+        valid_app_id = app_id if app_id and app_id not in ("unknown", "direct_input") else None
+        return {
+            "artifact_id": self.artifact_id,
+            "application_id": valid_app_id,
+            "legal_brief": self.legal_brief,
+            "decomposed_issues": self.decomposed_issues,
+            "config": dict(zip(_ROW_CONFIG_KEYS, _row_config_values(self.config))),
+            "final_articles": self.final_articles,
+            "final_coverage": self.final_coverage,
+            "stop_reason": self.stop_reason,
+            "stop_iteration": self.stop_iteration,
+            "total_iterations": self.total_iterations,
+            "total_articles": self.total_articles,
+            "total_llm_calls": self.total_llm_calls,
+            "total_embedding_calls": self.total_embedding_calls,
+            "total_latency_ms": self.total_latency_ms,
+            "avg_similarity": float(self.avg_similarity) if self.avg_similarity else None,
+            "top_3_similarity": float(self.top_3_similarity) if self.top_3_similarity else None,
+            "coverage_score": float(self.coverage_score) if self.coverage_score else None,
+            "estimated_cost_usd": float(self.estimated_cost_usd) if self.estimated_cost_usd else None,
+        }
+
+    @staticmethod
+    def _row_iteration(it: IterationLog) -> dict:
+        """Convert one iteration log for the retrieval_eval_artifacts row."""
+        return {
+            "iteration_number": it.iteration_number,
+            "purpose": it.purpose.value,
+            "queries": [
+                {
+                    "query_id": q.query_id,
+                    "query_type": q.query_type,
+                    "query_text": q.query_text,
+                    "query_language": q.query_language,
+                    "hypothetical_generated": q.hypothetical_generated,
+                    "articles_found": q.articles_found,
+                    "similarities": q.similarities,
+                    "hyde_latency_ms": q.hyde_latency_ms,
+                    "embedding_latency_ms": q.embedding_latency_ms,
+                    "search_latency_ms": q.search_latency_ms,
+                    "total_latency_ms": q.total_latency_ms,
+                }
+                for q in it.queries
+            ],
+            "articles_retrieved": it.articles_retrieved,
+            "articles_new": it.articles_new,
+            "cross_refs_found": list(it.cross_refs_found) if it.cross_refs_found else [],
+            "coverage_before": it.coverage_before,
+            "coverage_after": it.coverage_after,
+            "gaps_identified": it.gaps_identified,
+            "llm_calls": it.llm_calls,
+            "embedding_calls": it.embedding_calls,
+            "latency_ms": it.latency_ms,
+        }
+
+    def to_row(self) -> dict:
+        """Convert to a retrieval_eval_artifacts row."""
+        return {
+            **self._row_summary(),
+            "iterations": [self._row_iteration(it) for it in self.iterations],
+        }
+
+    def to_json(self) -> bytes:
+        """Serialize to_row() as UTF-8 JSON bytes, ready to post as the row."""
+        return orjson.dumps(self.to_row(), option=_ROW_JSON_OPTIONS)
+
+    def stream_to_json(self, out: IO[bytes]) -> None:
+        """
+        Write the to_json() document to out one iteration at a time.
+
+        Only one iteration's dict is materialized at once, instead of the
+        whole nested structure.
+        """
+        summary = orjson.dumps(self._row_summary(), option=_ROW_JSON_OPTIONS)
+        out.write(summary[:-1])
+        out.write(b',"iterations":[')
+        for i, it in enumerate(self.iterations):
+            if i:
+                out.write(b",")
+            out.write(orjson.dumps(self._row_iteration(it), option=_ROW_JSON_OPTIONS))
+        out.write(b"]}")
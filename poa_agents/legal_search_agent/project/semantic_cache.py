@@ -0,0 +1,82 @@
+"""
+Near-duplicate query cache for semantic search results.
+
+HyDE and gap-filling queries often produce embeddings that are almost
+identical to earlier ones. This cache returns the earlier results when a
+new query embedding's cosine similarity to a cached one is high enough.
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+
+class SemanticSearchCache:
+    """
+    Bounded similarity-LRU cache of search results keyed by query embedding.
+
+    Cached embeddings are kept L2-normalized as rows of one matrix, so a
+    lookup is a single matrix-vector product giving the cosine similarity
+    to every cached query. A hit refreshes the entry's recency.
+    """
+
+    def __init__(self, capacity: int = 512, threshold: float = 0.97):
+        """
+        Args:
+            capacity: Maximum number of cached queries
+            threshold: Minimum cosine similarity for a cache hit
+        """
+        self.capacity = capacity
+        self.threshold = threshold
+        # Row i holds the unit embedding cached in slot i (zeros when unused)
+        self._matrix: Optional[np.ndarray] = None
+        # slot -> (search params, cached value), least recently used first
+        self._slots: OrderedDict[int, tuple[tuple, Any]] = OrderedDict()
+
+    @staticmethod
+    def _normalize(embedding: list[float]) -> np.ndarray:
+        """Return the embedding as an L2-normalized float32 vector."""
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def get(
+        self,
+        embedding: list[float],
+        params: tuple,
+        usable: Optional[Callable[[Any], bool]] = None,
+    ) -> Optional[Any]:
+        """
+        Return the cached value for a near-duplicate query with the same params.
+
+        If usable is given, entries it rejects are skipped. Values are
+        returned as stored, so callers must not mutate them.
+        """
+        if not self._slots:
+            return None
+        scores = self._matrix @ self._normalize(embedding)
+        candidates = np.flatnonzero(scores >= self.threshold)
+        for slot in candidates[np.argsort(-scores[candidates])]:
+            entry = self._slots.get(int(slot))
+            if entry is not None and entry[0] == params and (usable is None or usable(entry[1])):
+                self._slots.move_to_end(int(slot))
+                return entry[1]
+        return None
+
+    def put(self, embedding: list[float], params: tuple, value: Any) -> None:
+        """Cache a value for a query, reusing the least recently used slot when full."""
+        vec = self._normalize(embedding)
+        if self._matrix is None:
+            self._matrix = np.zeros((self.capacity, vec.shape[0]), dtype=np.float32)
+        if len(self._slots) >= self.capacity:
+            slot, _ = self._slots.popitem(last=False)
+        else:
+            slot = len(self._slots)
+        self._matrix[slot] = vec
+        self._slots[slot] = (params, value)
+
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        self._slots.clear()
+        if self._matrix is not None:
+            self._matrix[:] = 0.0
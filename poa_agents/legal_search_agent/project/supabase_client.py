@@ -1,21 +1,83 @@
 """Supabase client for the Legal Search Agent."""
 import os
+import threading
+import time
+from itertools import islice
 from typing import Optional
-from datetime import datetime
+from datetime import datetime, timezone
 
+import numpy as np
 from supabase import create_client, Client
 from agentex.lib.utils.logging import make_logger
 
+from project.semantic_cache import SemanticSearchCache
+from project.ttl_cache import MISS, TTLCache
+from shared.postgrest_session import insert_json, use_pooled_session
+
 logger = make_logger(__name__)
 
+# Columns needed to build an ArticleResult (embeddings are never needed client-side)
+ARTICLE_COLUMNS = "article_number, law_id, hierarchy_path, text_arabic, text_english, citation"
+
+# Threshold used when no article clears the requested one
+FALLBACK_THRESHOLD = 0.2
+
+# PostgREST returns at most this many rows per request
+PAGE_SIZE = 1000
+
+# Seconds before the set of known article keys is reloaded
+KNOWN_ARTICLES_TTL = 3600
+
+
+def _vector_literal(embedding: list[float]) -> str:
+    """
+    Encode an embedding as a pgvector text literal at fp16 precision.
+
+    The shortest fp16 representations are about 2.5x smaller on the wire than
+    JSON float64 lists; the rounding does not change cosine rankings in practice.
+    """
+    return "[" + ",".join(np.asarray(embedding, dtype=np.float16).astype(str)) + "]"
+
+
+def _apply_threshold(rows: list[dict], similarity_threshold: float) -> list[dict]:
+    """
+    Keep rows at or above the requested threshold, or all rows if none are.
+
+    Rows come back ordered by descending similarity from a search run at
+    min(similarity_threshold, FALLBACK_THRESHOLD), so this matches searching
+    at the requested threshold and retrying at the fallback one when empty.
+    """
+    strong = [r for r in rows if r.get("similarity", 0) >= similarity_threshold]
+    return strong if strong else rows
+
+
+def _take(rows: tuple[dict, ...], limit: int, exclude: set[int]) -> list[dict]:
+    """Copies of the first limit rows whose article is not in exclude."""
+    kept = (r for r in rows if r.get("article_number") not in exclude)
+    return [dict(r) for r in islice(kept, limit)]
+
 
 class LegalSearchSupabaseClient:
     """Client for legal article search and result storage."""
 
-    def __init__(self):
-        """Initialize the Supabase client."""
+    def __init__(self, ef_search: Optional[int] = None):
+        """
+        Initialize the Supabase client.
+
+        SUPABASE_URL, SUPABASE_ANON_KEY, SUPABASE_MAX_CONNECTIONS and
+        HNSW_EF_SEARCH are read once here; the agent keeps a single instance
+        for its lifetime, so changes need a restart.
+
+        Args:
+            ef_search: HNSW candidate list size for searches (defaults to
+                HNSW_EF_SEARCH, else the RPC derives it from match_count)
+        """
         supabase_url = os.getenv("SUPABASE_URL")
         supabase_key = os.getenv("SUPABASE_ANON_KEY")
+        max_connections = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20"))
+        if ef_search is None and os.getenv("HNSW_EF_SEARCH"):
+            ef_search = int(os.getenv("HNSW_EF_SEARCH"))
+        self.ef_search = ef_search
 
         if not supabase_url or not supabase_key:
             raise ValueError(
@@ -24,6 +86,39 @@ class LegalSearchSupabaseClient:
 
         logger.info(f"Initializing Supabase client - URL: {supabase_url}")
         self.client: Client = create_client(supabase_url, supabase_key)
+        # Postgres connections are pooled server-side by PostgREST, so the
+        # client pool only needs to cover the worker threads calling it
+        use_pooled_session(
+            self.client,
+            max_connections=max_connections,
+            max_keepalive_connections=max(1, max_connections // 2),
+            keepalive_expiry=60.0,
+        )
+        self.local_index = None
+        if os.getenv("USE_LOCAL_ANN", "false").lower() == "true":
+            self._load_local_index()
+        self.search_cache = SemanticSearchCache(capacity=512, threshold=0.97)
+        # (article_number, law_id) -> article row, or None for a known miss
+        self._article_cache = TTLCache(maxsize=4096, ttl=600, negative_ttl=60)
+        # Every (article_number, law_id) and (article_number, None) of the
+        # active poa_articles, loaded in the background
+        self._known_articles: Optional[frozenset[tuple[int, Optional[int]]]] = None
+        self._known_articles_loaded_at: Optional[float] = None
+        self._known_articles_refreshing = False
+        self._known_articles_lock = threading.Lock()
+        self._refresh_known_articles()
+
+    def _load_local_index(self) -> None:
+        """Load (or build and persist) the local embedding mirror used by _fallback_search."""
+        from project.local_index import LocalArticleIndex
+
+        path = os.getenv("LOCAL_ANN_PATH", "/var/cache/legal_ann")
+        try:
+            self.local_index = LocalArticleIndex.load_or_build(
+                self.client, path, int(os.getenv("EMBEDDING_DIMENSIONS", "1536"))
+            )
+        except Exception as e:
+            logger.warning(f"Local article index unavailable: {e}")
 
     def get_legal_brief(self, application_id: str) -> Optional[dict]:
         """
@@ -33,12 +128,12 @@ class LegalSearchSupabaseClient:
             application_id: The application UUID
 
         Returns:
-            Legal Brief row or None
+            Legal Brief row (id, application_id, brief_content, generated_at) or None
         """
         try:
             response = (
                 self.client.table("legal_briefs")
-                .select("*")
+                .select("id, application_id, brief_content, generated_at")
                 .eq("application_id", application_id)
                 .order("generated_at", desc=True)
                 .limit(1)
@@ -54,7 +149,8 @@ class LegalSearchSupabaseClient:
         query_embedding: list[float],
         language: str = "english",
         limit: int = 5,
-        similarity_threshold: float = 0.3
+        similarity_threshold: float = 0.3,
+        exclude: Optional[set[int]] = None
     ) -> list[dict]:
         """
         Perform semantic search on poa_articles table.
@@ -64,50 +160,170 @@ class LegalSearchSupabaseClient:
             language: Language for search (english or arabic)
             limit: Maximum results
             similarity_threshold: Minimum similarity
+            exclude: Article numbers to leave out of the results
 
         Returns:
             List of articles with similarity scores
         """
         logger.info(f"Semantic search - language: {language}, limit: {limit}")
 
-        try:
-            response = self.client.rpc(
-                "match_poa_articles",
-                {
-                    "query_embedding": query_embedding,
-                    "match_threshold": float(similarity_threshold),
-                    "match_count": int(limit),
-                    "language": language,
-                }
-            ).execute()
+        exclude = exclude or set()
+        match_threshold = min(float(similarity_threshold), FALLBACK_THRESHOLD)
+        params = (language, match_threshold)
+        cached = self._cached_search(query_embedding, params, limit, exclude)
+        if cached is not None:
+            logger.info(f"Semantic cache hit - {len(cached)} articles")
+            return _apply_threshold(cached, similarity_threshold)
 
-            results = response.data if response.data else []
+        try:
+            # One RPC at the fallback threshold; stronger matches are filtered here
+            rpc_params = {
+                "query_embedding": _vector_literal(query_embedding),
+                "match_threshold": match_threshold,
+                "match_count": int(limit),
+                "language": language,
+            }
+            if exclude:
+                rpc_params["exclude_ids"] = sorted(exclude)
+            if self.ef_search:
+                rpc_params["ef_search"] = self.ef_search
+            response = self.client.rpc("match_poa_articles", rpc_params).execute()
+
+            rows = tuple(response.data or [])
+            self.search_cache.put(query_embedding, params, (frozenset(exclude), int(limit), rows))
+            results = _apply_threshold([dict(r) for r in rows], similarity_threshold)
             logger.info(f"Found {len(results)} articles")
-
-            # If no results, try with lower threshold
-            if len(results) == 0 and similarity_threshold > 0.2:
-                logger.info("Retrying with lower threshold (0.2)...")
-                response = self.client.rpc(
-                    "match_poa_articles",
-                    {
-                        "query_embedding": query_embedding,
-                        "match_threshold": 0.2,
-                        "match_count": int(limit),
-                        "language": language,
-                    }
-                ).execute()
-                results = response.data if response.data else []
-                logger.info(f"Found {len(results)} articles with lower threshold")
-
             return results
 
         except Exception as e:
             logger.error(f"Semantic search failed: {e}")
             # Try fallback to get some articles
-            return self._fallback_search(limit)
+            return self._fallback_search(limit, query_embedding, language, exclude)
+
+    def _cached_search(
+        self,
+        query_embedding: list[float],
+        params: tuple,
+        limit: int,
+        exclude: set[int],
+    ) -> Optional[list[dict]]:
+        """
+        Serve a search from search_cache, or return None.
+
+        Entries hold the top `depth` rows of a search run with the `excluded`
+        articles left out. One answers any exclude set that contains
+        `excluded` and still leaves at least limit of its rows (or any such
+        exclude set, if the search returned fewer than depth rows).
+        """
+        def usable(entry: tuple[frozenset[int], int, tuple[dict, ...]]) -> bool:
+            excluded, depth, rows = entry
+            if not excluded <= exclude:
+                return False
+            if len(rows) < depth:
+                return True
+            kept = (r for r in rows if r.get("article_number") not in exclude)
+            return sum(1 for _ in islice(kept, limit)) == limit
+
+        entry = self.search_cache.get(query_embedding, params, usable)
+        if entry is None:
+            return None
+        return _take(entry[2], limit, exclude)
+
+    def semantic_search_batch(
+        self,
+        query_embeddings: list[list[float]],
+        language: str = "english",
+        limit: int = 5,
+        similarity_threshold: float = 0.3,
+        exclude: Optional[set[int]] = None
+    ) -> list[list[dict]]:
+        """
+        Perform semantic search for several query embeddings in one RPC call.
+
+        Args:
+            query_embeddings: Embedding vectors (1536 dimensions each)
+            language: Language for search (english or arabic)
+            limit: Maximum results per query
+            similarity_threshold: Minimum similarity
+            exclude: Article numbers to leave out of the results
+
+        Returns:
+            One list of articles with similarity scores per query, in input order
+        """
+        if not query_embeddings:
+            return []
+
+        exclude = exclude or set()
+        match_threshold = min(float(similarity_threshold), FALLBACK_THRESHOLD)
+        params = (language, match_threshold)
+        grouped: list[list[dict]] = [[] for _ in query_embeddings]
+        misses: list[int] = []
+        for i, embedding in enumerate(query_embeddings):
+            cached = self._cached_search(embedding, params, limit, exclude)
+            if cached is None:
+                misses.append(i)
+            else:
+                grouped[i] = _apply_threshold(cached, similarity_threshold)
+
+        logger.info(
+            f"Batch semantic search - {len(query_embeddings)} queries "
+            f"({len(query_embeddings) - len(misses)} cached), "
+            f"language: {language}, limit: {limit}"
+        )
+        if not misses:
+            return grouped
+
+        try:
+            rpc_params = {
+                "query_embeddings": [_vector_literal(query_embeddings[i]) for i in misses],
+                "match_threshold": match_threshold,
+                "match_count": int(limit),
+                "language": language,
+            }
+            if exclude:
+                rpc_params["exclude_ids"] = sorted(exclude)
+            if self.ef_search:
+                rpc_params["ef_search"] = self.ef_search
+            response = self.client.rpc("match_poa_articles_batch", rpc_params).execute()
+        except Exception as e:
+            logger.warning(f"Batch semantic search failed, searching per query: {e}")
+            for i in misses:
+                grouped[i] = self.semantic_search(
+                    query_embeddings[i], language, limit, similarity_threshold, exclude
+                )
+            return grouped
+
+        for row in response.data or []:
+            grouped[misses[row.pop("query_idx")]].append(row)
+
+        excluded = frozenset(exclude)
+        for i in misses:
+            rows = tuple(grouped[i])
+            self.search_cache.put(query_embeddings[i], params, (excluded, int(limit), rows))
+            grouped[i] = _apply_threshold([dict(r) for r in rows], similarity_threshold)
+
+        logger.info(f"Found {sum(len(grouped[i]) for i in misses)} articles across queries")
+        return grouped
+
+    def _fallback_search(
+        self,
+        limit: int,
+        query_embedding: Optional[list[float]] = None,
+        language: str = "english",
+        exclude: Optional[set[int]] = None
+    ) -> list[dict]:
+        """
+        Fallback search if semantic search fails.
+
+        Ranks by true similarity against the local embedding mirror when it is
+        enabled (USE_LOCAL_ANN=true); otherwise returns arbitrary active articles.
+        """
+        if self.local_index is not None and query_embedding is not None:
+            logger.warning("Using local index fallback search")
+            exclude = exclude or set()
+            results = self.local_index.search(query_embedding, language, limit + len(exclude))
+            return [r for r in results if r["article_number"] not in exclude][:limit]
 
-    def _fallback_search(self, limit: int) -> list[dict]:
-        """Fallback search if semantic search fails."""
         logger.warning("Using fallback text search")
         try:
             response = (
@@ -137,21 +353,160 @@ class LegalSearchSupabaseClient:
         Returns:
             Article dict or None
         """
+        cache_key = (article_number, law_id or None)
+        cached = self._article_cache.get(cache_key)
+        if cached is not MISS:
+            return cached
+
+        known = self._known_article_keys()
+        unknown = known is not None and cache_key not in known
+
         try:
             query = (
                 self.client.table("poa_articles")
-                .select("*")
+                .select(ARTICLE_COLUMNS)
                 .eq("article_number", article_number)
             )
             if law_id:
                 query = query.eq("law_id", law_id)
 
             response = query.limit(1).execute()
-            return response.data[0] if response.data else None
+            article = response.data[0] if response.data else None
         except Exception as e:
             logger.error(f"Failed to get article {article_number}: {e}")
             return None
 
+        self._cache_article(cache_key, article, unknown)
+        return article
+
+    def get_articles_by_numbers(self, article_numbers: list[int]) -> list[dict]:
+        """
+        Get several articles by number in one query.
+
+        Args:
+            article_numbers: The article numbers
+
+        Returns:
+            Article dicts in the order of article_numbers (one per number found)
+        """
+        by_number: dict[int, dict] = {}
+        missing = []
+        for n in article_numbers:
+            cached = self._article_cache.get((n, None))
+            if cached is MISS:
+                missing.append(n)
+            elif cached is not None:
+                by_number[n] = cached
+
+        rows: list[dict] = []
+        if missing:
+            try:
+                response = (
+                    self.client.table("poa_articles")
+                    .select(ARTICLE_COLUMNS)
+                    .in_("article_number", missing)
+                    .execute()
+                )
+                rows = response.data or []
+            except Exception as e:
+                logger.error(f"Failed to get articles {missing}: {e}")
+                missing = []
+
+        # Like get_article_by_number without law_id, keep the first row per number
+        for row in rows:
+            if row["article_number"] not in by_number:
+                by_number[row["article_number"]] = row
+        known = self._known_article_keys()
+        for n in missing:
+            self._cache_article(
+                (n, None), by_number.get(n), known is not None and (n, None) not in known
+            )
+
+        return [by_number[n] for n in article_numbers if n in by_number]
+
+    def _cache_article(self, key: tuple[int, Optional[int]], article: Optional[dict], unknown: bool) -> None:
+        """
+        Cache an article lookup result.
+
+        A miss for a key the known-articles set also lacks (typically a
+        citation the LLM made up) is cached for the full TTL rather than the
+        short negative one. A hit for such a key means the set is out of date,
+        so it is reloaded.
+        """
+        if article is None and unknown:
+            self._article_cache.put(key, None, ttl=self._article_cache.ttl)
+            return
+        if unknown:
+            self._refresh_known_articles()
+        self._article_cache.put(key, article)
+
+    def _known_article_keys(self) -> Optional[frozenset[tuple[int, Optional[int]]]]:
+        """
+        Return the known active article keys, or None until they first load.
+
+        Never blocks: once the set is older than KNOWN_ARTICLES_TTL it is
+        reloaded in the background and the previous set is returned meanwhile.
+        """
+        loaded_at = self._known_articles_loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at > KNOWN_ARTICLES_TTL:
+            self._refresh_known_articles()
+        return self._known_articles
+
+    def _refresh_known_articles(self) -> None:
+        """Reload the known article keys on a daemon thread (one reload at a time)."""
+        with self._known_articles_lock:
+            if self._known_articles_refreshing:
+                return
+            self._known_articles_refreshing = True
+
+        def reload() -> None:
+            keys = self._load_article_keys()
+            with self._known_articles_lock:
+                # A failed reload keeps the previous set until the next TTL expiry
+                if keys is not None:
+                    self._known_articles = keys
+                self._known_articles_loaded_at = time.monotonic()
+                self._known_articles_refreshing = False
+
+        threading.Thread(target=reload, name="known-article-keys", daemon=True).start()
+
+    def _load_article_keys(self) -> Optional[frozenset[tuple[int, Optional[int]]]]:
+        """Page through the active poa_articles collecting (article_number, law_id) keys."""
+        keys: set[tuple[int, Optional[int]]] = set()
+        start = 0
+        try:
+            while True:
+                response = (
+                    self.client.table("poa_articles")
+                    .select("article_number, law_id")
+                    .eq("is_active", True)
+                    .order("id")
+                    .range(start, start + PAGE_SIZE - 1)
+                    .execute()
+                )
+                page = response.data or []
+                for row in page:
+                    keys.add((row["article_number"], row["law_id"]))
+                    keys.add((row["article_number"], None))
+                if len(page) < PAGE_SIZE:
+                    break
+                start += PAGE_SIZE
+        except Exception as e:
+            logger.warning(f"Could not load article keys: {e}")
+            return None
+
+        logger.info(f"Loaded {len(keys)} known article keys")
+        return frozenset(keys)
+
+    def cache_clear(self) -> None:
+        """Drop cached articles and search results (e.g. after re-ingesting laws)."""
+        with self._known_articles_lock:
+            self._known_articles = None
+            self._known_articles_loaded_at = None
+        self._refresh_known_articles()
+        self._article_cache.clear()
+        self.search_cache.clear()
+
     def save_legal_opinion(
         self,
         application_id: str,
@@ -169,6 +524,7 @@ class LegalSearchSupabaseClient:
         Returns:
             Saved row or None
         """
+        now = datetime.now(timezone.utc).isoformat()
         try:
             row = {
                 "application_id": application_id,
@@ -186,7 +542,7 @@ class LegalSearchSupabaseClient:
                 "retrieval_coverage": opinion.get("retrieval_coverage", 0),
                 "has_contradictions": False,
                 "needs_escalation": opinion.get("decision_bucket") == "needs_review",
-                "created_at": datetime.now().isoformat()
+                "created_at": now
             }
 
             response = (
@@ -218,13 +574,14 @@ class LegalSearchSupabaseClient:
         Returns:
             Saved row or None
         """
+        now = datetime.now(timezone.utc).isoformat()
         try:
             row = {
                 "application_id": application_id,
                 "legal_brief_id": legal_brief_id,
                 "status": status,
-                "started_at": datetime.now().isoformat(),
-                "completed_at": datetime.now().isoformat() if status == "completed" else None
+                "started_at": now,
+                "completed_at": now if status == "completed" else None
             }
 
             response = (
@@ -252,84 +609,11 @@ class LegalSearchSupabaseClient:
         Returns:
             Saved row or None
         """
-        from project.models.retrieval_state import RetrievalEvalArtifact
-
         try:
-            # Convert dataclass to dict for storage
-            # Only use application_id if it's a valid UUID (not placeholder values)
-            app_id = artifact.application_id
-            valid_app_id = app_id if app_id and app_id not in ("unknown", "direct_input") else None
-            row = {
-                "artifact_id": artifact.artifact_id,
-                "application_id": valid_app_id,
-                "legal_brief": artifact.legal_brief,
-                "decomposed_issues": artifact.decomposed_issues,
-                "config": {
-                    "hyde_enabled": artifact.config.hyde_enabled,
-                    "hyde_num_hypotheticals": artifact.config.hyde_num_hypotheticals,
-                    "max_iterations": artifact.config.max_iterations,
-                    "max_articles": artifact.config.max_articles,
-                    "max_latency_ms": artifact.config.max_latency_ms,
-                    "coverage_threshold": artifact.config.coverage_threshold,
-                    "confidence_threshold": artifact.config.confidence_threshold,
-                    "enable_coverage_check": artifact.config.enable_coverage_check,
-                    "enable_cross_references": artifact.config.enable_cross_references,
-                },
-                "iterations": [
-                    {
-                        "iteration_number": it.iteration_number,
-                        "purpose": it.purpose.value,
-                        "queries": [
-                            {
-                                "query_id": q.query_id,
-                                "query_type": q.query_type,
-                                "query_text": q.query_text,
-                                "query_language": q.query_language,
-                                "hypothetical_generated": q.hypothetical_generated,
-                                "articles_found": q.articles_found,
-                                "similarities": q.similarities,
-                                "hyde_latency_ms": q.hyde_latency_ms,
-                                "embedding_latency_ms": q.embedding_latency_ms,
-                                "search_latency_ms": q.search_latency_ms,
-                                "total_latency_ms": q.total_latency_ms,
-                            }
-                            for q in it.queries
-                        ],
-                        "articles_retrieved": it.articles_retrieved,
-                        "articles_new": it.articles_new,
-                        "cross_refs_found": list(it.cross_refs_found) if it.cross_refs_found else [],
-                        "coverage_before": it.coverage_before,
-                        "coverage_after": it.coverage_after,
-                        "gaps_identified": it.gaps_identified,
-                        "llm_calls": it.llm_calls,
-                        "embedding_calls": it.embedding_calls,
-                        "latency_ms": it.latency_ms,
-                    }
-                    for it in artifact.iterations
-                ],
-                "final_articles": artifact.final_articles,
-                "final_coverage": artifact.final_coverage,
-                "stop_reason": artifact.stop_reason,
-                "stop_iteration": artifact.stop_iteration,
-                "total_iterations": artifact.total_iterations,
-                "total_articles": artifact.total_articles,
-                "total_llm_calls": artifact.total_llm_calls,
-                "total_embedding_calls": artifact.total_embedding_calls,
-                "total_latency_ms": artifact.total_latency_ms,
-                "avg_similarity": float(artifact.avg_similarity) if artifact.avg_similarity else None,
-                "top_3_similarity": float(artifact.top_3_similarity) if artifact.top_3_similarity else None,
-                "coverage_score": float(artifact.coverage_score) if artifact.coverage_score else None,
-                "estimated_cost_usd": float(artifact.estimated_cost_usd) if artifact.estimated_cost_usd else None,
-            }
-
-            response = (
-                self.client.table("retrieval_eval_artifacts")
-                .insert(row)
-                .execute()
-            )
+            saved = insert_json(self.client, "retrieval_eval_artifacts", artifact.to_json())
 
             logger.info(f"Saved retrieval artifact: {artifact.artifact_id}")
-            return response.data[0] if response.data else None
+            return saved[0] if saved else None
 
         except Exception as e:
             logger.error(f"Failed to save retrieval artifact: {e}")
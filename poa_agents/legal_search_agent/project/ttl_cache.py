@@ -0,0 +1,68 @@
+"""
+Bounded LRU cache with expiry for Supabase lookups.
+
+Articles rarely change while the agent is running, and cross-reference
+expansion looks up the same articles over and over. Known misses are
+cached too, on a shorter TTL, so unknown ids don't hit Supabase on every
+retry.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+# Returned by TTLCache.get when a key is absent or expired (None is a valid cached value)
+MISS = object()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after a fixed time.
+
+    Storing None caches a negative result, which expires after negative_ttl.
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 600.0, negative_ttl: float = 60.0):
+        """
+        Args:
+            maxsize: Maximum number of cached entries
+            ttl: Seconds a found value stays cached
+            negative_ttl: Seconds a None (not found) result stays cached
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        # key -> (expires_at, value), least recently used first
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value for key, or MISS if absent or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISS
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return MISS
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Cache a value (None for a known miss), evicting the least recently used beyond maxsize.
+
+        ttl overrides the default expiry (ttl, or negative_ttl for None).
+        """
+        if ttl is None:
+            ttl = self.negative_ttl if value is None else self.ttl
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        with self._lock:
+            self._entries.clear()
@@ -2,9 +2,9 @@
 Shared utilities for POA validation agents.
 """
 
-from .llm_client import LLMClient, get_llm_client
+from importlib import import_module
+
 from .supabase_client import get_supabase_client
-from .rag_client import RAGClient, get_rag_client
 from .schema import (
     Application,
     PersonalParty,
@@ -20,6 +20,24 @@ from .schema import (
     LegalOpinion,
 )
 
+# The LLM and RAG clients pull in openai and numpy; they are imported on
+# first access so agents that only use the schema and Supabase helpers
+# (Tier 1) don't need those packages installed
+_LAZY_EXPORTS = {
+    "LLMClient": ".llm_client",
+    "get_llm_client": ".llm_client",
+    "RAGClient": ".rag_client",
+    "get_rag_client": ".rag_client",
+}
+
+
+def __getattr__(name: str):
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(module, __name__), name)
+
+
 __all__ = [
     "LLMClient",
     "get_llm_client",
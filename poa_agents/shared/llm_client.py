@@ -3,11 +3,108 @@ LLM Client wrapper for Azure OpenAI.
 Shared across all POA agents.
 """
 
+import hashlib
 import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
 from typing import Optional
+
+import httpx
+import numpy as np
 from openai import AsyncAzureOpenAI
 
 
+# Pool sized so parallel gather() calls (e.g. HyDE drafts) don't queue on connections
+HTTP_POOL_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=32)
+HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+
+def _unit_vector(embedding: list[float]) -> np.ndarray:
+    """Convert an API embedding to an L2-normalized float32 vector."""
+    vec = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vec)
+    if norm:
+        vec /= norm
+    return vec
+
+
+class EmbeddingCache:
+    """
+    LRU cache of embeddings keyed by SHA-256 of model and text.
+
+    Embeddings are stored as unit-length float32 vectors. Optionally persisted to a pickle file so vectors survive restarts.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        ttl: Optional[float] = None,
+        path: Optional[str] = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = path
+        # key -> (stored_at, embedding)
+        self._entries: OrderedDict[str, tuple[float, np.ndarray]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            self.load()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """Build the cache key for a model/text pair."""
+        return hashlib.sha256(f"{model}:{text}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Return a cached embedding, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is not None and self.ttl is not None and time.time() - entry[0] > self.ttl:
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: str, embedding: np.ndarray) -> None:
+        """Store an embedding, evicting the least recently used beyond maxsize."""
+        self._entries[key] = (time.time(), embedding)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def load(self) -> None:
+        """Load entries from the persistence file."""
+        try:
+            with open(self.path, "rb") as f:
+                # Older cache files hold list[float] embeddings
+                self._entries = OrderedDict(
+                    (key, (stored_at, np.asarray(embedding, dtype=np.float32)))
+                    for key, (stored_at, embedding) in pickle.load(f)
+                )
+        except (OSError, pickle.PickleError, EOFError):
+            self._entries = OrderedDict()
+
+    def save(self) -> None:
+        """Write entries to the persistence file (atomically)."""
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(list(self._entries.items()), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+
+
 class LLMClient:
     """Async Azure OpenAI client wrapper."""
     
@@ -18,6 +115,7 @@ class LLMClient:
         api_version: Optional[str] = None,
         model: Optional[str] = None,
         embedding_model: Optional[str] = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
     ):
         self.api_key = api_key or os.getenv("AZURE_OPENAI_API_KEY")
         self.endpoint = endpoint or os.getenv("AZURE_OPENAI_ENDPOINT")
@@ -30,10 +128,19 @@ class LLMClient:
         if not self.endpoint:
             raise ValueError("AZURE_OPENAI_ENDPOINT is required")
         
+        # Retries (connection errors, 429 and 5xx) are left to the SDK;
+        # transport-level retries on top would multiply the attempts per call
         self.client = AsyncAzureOpenAI(
             api_key=self.api_key,
             api_version=self.api_version,
             azure_endpoint=self.endpoint,
+            http_client=httpx.AsyncClient(
+                transport=httpx.AsyncHTTPTransport(http2=True, limits=HTTP_POOL_LIMITS),
+                timeout=HTTP_TIMEOUT,
+            ),
+        )
+        self.embedding_cache = embedding_cache or EmbeddingCache(
+            path=os.getenv("EMBEDDING_CACHE_PATH"),
         )
     
     async def chat(
@@ -72,26 +179,81 @@ class LLMClient:
         )
     
     async def get_embedding(self, text: str) -> list[float]:
-        """Generate embedding for text."""
+        """Generate embedding for text (served from the cache when seen before)."""
+        return (await self.get_embedding_array(text)).tolist()
+    
+    async def get_embeddings(self, texts: list[str]) -> list[list[float]]:
+        """Generate embeddings for several texts, in input order."""
+        return [embedding.tolist() for embedding in await self.get_embedding_arrays(texts)]
+    
+    async def get_embedding_array(self, text: str) -> np.ndarray:
+        """
+        Generate embedding for text as a unit-length float32 vector.
+
+        Served from the cache when seen before. Use get_embedding where the
+        vector must be JSON-serializable.
+        """
+        key = EmbeddingCache.make_key(self.embedding_model, text)
+        cached = self.embedding_cache.get(key)
+        if cached is not None:
+            return cached
         response = await self.client.embeddings.create(
             model=self.embedding_model,
             input=text,
         )
-        return response.data[0].embedding
+        embedding = _unit_vector(response.data[0].embedding)
+        self.embedding_cache.put(key, embedding)
+        return embedding
+    
+    async def get_embedding_arrays(self, texts: list[str]) -> list[np.ndarray]:
+        """
+        Generate embeddings (unit-length float32) for several texts, in input order.
+
+        Cached texts are served locally; the rest go out in one API request.
+        """
+        keys = [EmbeddingCache.make_key(self.embedding_model, text) for text in texts]
+        embeddings: list[Optional[np.ndarray]] = [self.embedding_cache.get(key) for key in keys]
+
+        # Unique uncached texts, each sent once
+        missing: dict[str, str] = {}
+        for text, key, embedding in zip(texts, keys, embeddings):
+            if embedding is None:
+                missing.setdefault(key, text)
+
+        if missing:
+            response = await self.client.embeddings.create(
+                model=self.embedding_model,
+                input=list(missing.values()),
+            )
+            fetched = {}
+            for key, item in zip(missing, sorted(response.data, key=lambda d: d.index)):
+                fetched[key] = _unit_vector(item.embedding)
+                self.embedding_cache.put(key, fetched[key])
+
+            embeddings = [
+                embedding if embedding is not None else fetched[key]
+                for key, embedding in zip(keys, embeddings)
+            ]
+
+        return embeddings
     
     async def close(self):
-        """Close the client."""
+        """Close the client and its HTTP pool, persisting the embedding cache if configured."""
+        self.embedding_cache.save()
         await self.client.close()
 
 
 # Singleton instance
 _llm_client: Optional[LLMClient] = None
+_llm_client_lock = threading.Lock()
 
 
 def get_llm_client() -> LLMClient:
-    """Get or create the singleton LLM client."""
+    """Get or create the singleton LLM client (safe under concurrent first calls)."""
     global _llm_client
     if _llm_client is None:
-        _llm_client = LLMClient()
+        with _llm_client_lock:
+            if _llm_client is None:
+                _llm_client = LLMClient()
     return _llm_client
 
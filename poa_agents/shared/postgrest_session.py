@@ -0,0 +1,98 @@
+"""
+Pooled PostgREST session and orjson inserts, shared by the Supabase clients.
+"""
+
+from typing import Optional
+
+import httpx
+import orjson
+from postgrest.exceptions import APIError
+from pydantic import BaseModel
+from supabase import Client
+
+
+def use_pooled_session(
+    client: Client,
+    max_connections: int,
+    max_keepalive_connections: Optional[int] = None,
+    keepalive_expiry: float = 5.0,
+) -> None:
+    """
+    Swap the PostgREST session for an HTTP/2 client with a bounded keep-alive pool.
+
+    Every table query and RPC goes through this session, so repeated calls
+    reuse warm connections instead of paying a TLS handshake each time. The
+    base URL, auth headers, timeout, TLS verification and proxy configured on
+    the original session are carried over.
+    """
+    postgrest = client.postgrest
+    default_session = postgrest.session
+    postgrest.session = httpx.Client(
+        base_url=default_session.base_url,
+        headers=default_session.headers,
+        timeout=default_session.timeout,
+        verify=getattr(postgrest, "verify", True),
+        proxy=getattr(postgrest, "proxy", None),
+        follow_redirects=default_session.follow_redirects,
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections or max_connections,
+            keepalive_expiry=keepalive_expiry,
+        ),
+    )
+    default_session.close()
+
+
+def _json_default(obj):
+    """orjson fallback for values it can't encode natively (Pydantic models)."""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def insert_json(client: Client, table: str, records: dict | list[dict] | bytes) -> list[dict]:
+    """
+    Insert rows, encoding the body with orjson instead of stdlib json.
+
+    Posts through the client's PostgREST session (which carries the base URL
+    and auth headers); datetimes, enums, numpy arrays and nested Pydantic
+    models are encoded directly, without a model_dump round-trip. Records
+    already encoded as JSON bytes are posted as they are.
+
+    Raises:
+        APIError: If PostgREST rejects the insert, as the query builder would
+    """
+    if not isinstance(records, bytes):
+        records = orjson.dumps(
+            records,
+            default=_json_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        )
+    response = client.postgrest.session.post(
+        f"/{table}",
+        content=records,
+        headers={
+            "Content-Type": "application/json",
+            "Prefer": "return=representation",
+        },
+    )
+    if response.is_error:
+        raise _api_error(response)
+    return orjson.loads(response.content) if response.content else []
+
+
+def _api_error(response: httpx.Response) -> APIError:
+    """Build the APIError postgrest raises for an error response."""
+    try:
+        error = orjson.loads(response.content)
+    except orjson.JSONDecodeError:
+        error = None
+    if not isinstance(error, dict):
+        error = {
+            "message": "JSON could not be generated",
+            "code": str(response.status_code),
+            "hint": "Refer to full message for details",
+            "details": str(response.content),
+        }
+    return APIError(error)
@@ -3,15 +3,29 @@ RAG Client for legal article retrieval.
 Uses semantic search over the articles table.
 """
 
+import asyncio
+import json
 import os
+import threading
 from typing import Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from bisect import bisect_right
+from itertools import accumulate, islice
+
+import numpy as np
+from agentex.lib.utils.logging import make_logger
+from postgrest.exceptions import APIError
 
 from .llm_client import LLMClient, get_llm_client
 from .supabase_client import get_supabase_client
 
+logger = make_logger(__name__)
+
+# Upper bound on concurrent Supabase searches when the batch RPC is unavailable
+MAX_CONCURRENT_SEARCHES = 8
 
-@dataclass
+
+@dataclass(slots=True)
 class Article:
     """A retrieved legal article."""
     article_number: int
@@ -19,32 +33,100 @@ class Article:
     text_english: Optional[str]
     hierarchy_path: Optional[dict]
     similarity: float
+    # Unit-length float32 vector; only set when retrieved with_embeddings
+    embedding: Optional[np.ndarray] = field(default=None, repr=False, compare=False)
+    _ctx: Optional[str] = field(default=None, init=False, repr=False, compare=False)
     
     @property
     def text(self) -> str:
         """Return English text if available, otherwise Arabic."""
         return self.text_english or self.text_arabic or ""
     
+    def min_context_length(self) -> int:
+        """Lower bound on len(to_context_string()) without formatting it."""
+        if self._ctx is not None:
+            return len(self._ctx)
+        return CONTEXT_OVERHEAD + len(str(self.article_number)) + len(self.text)
+    
     def to_context_string(self) -> str:
-        """Format article for inclusion in LLM context."""
-        hierarchy = ""
-        if self.hierarchy_path:
-            parts = []
-            if self.hierarchy_path.get("law"):
-                parts.append(f"Law: {self.hierarchy_path['law']}")
-            if self.hierarchy_path.get("chapter"):
-                parts.append(f"Chapter: {self.hierarchy_path['chapter']}")
-            if self.hierarchy_path.get("section"):
-                parts.append(f"Section: {self.hierarchy_path['section']}")
-            hierarchy = " > ".join(parts)
-        
-        return f"""
+        """Format article for inclusion in LLM context (built once, then cached)."""
+        if self._ctx is None:
+            hierarchy = ""
+            if self.hierarchy_path:
+                hierarchy = " > ".join(
+                    f"{label}: {value}"
+                    for label, value in (
+                        ("Law", self.hierarchy_path.get("law")),
+                        ("Chapter", self.hierarchy_path.get("chapter")),
+                        ("Section", self.hierarchy_path.get("section")),
+                    )
+                    if value
+                )
+            
+            self._ctx = f"""
 Article {self.article_number}
 {f"({hierarchy})" if hierarchy else ""}
 
 {self.text}
 ---
 """
+        return self._ctx
+
+
+def _vector_literal(embedding: np.ndarray) -> str:
+    """
+    Encode an embedding as a pgvector text literal.
+
+    float32 values print at their shortest round-trip form, about half the
+    JSON size of the float64 lists the API returns.
+    """
+    return "[" + ",".join(np.asarray(embedding, dtype=np.float32).astype(str)) + "]"
+
+
+# Characters to_context_string adds around the article number, hierarchy and text
+CONTEXT_OVERHEAD = 17
+
+
+def mmr_rerank(articles: list[Article], diversity: float = 0.3) -> list[Article]:
+    """
+    Reorder articles by maximal marginal relevance.
+
+    Each pick maximizes (1 - diversity) * similarity minus diversity times the
+    article's highest cosine similarity to those already picked. All pairwise
+    similarities come from one float32 matmul. Articles are returned unchanged
+    if any lacks an embedding.
+    """
+    if len(articles) < 3 or any(a.embedding is None for a in articles):
+        return articles
+    
+    vectors = np.stack([a.embedding for a in articles]).astype(np.float32, copy=False)
+    pairwise = vectors @ vectors.T
+    relevance = (1.0 - diversity) * np.fromiter(
+        (a.similarity for a in articles), dtype=np.float32, count=len(articles)
+    )
+    
+    # Highest similarity of each article to the picked set (none picked yet)
+    redundancy = np.zeros(len(articles), dtype=np.float32)
+    available = np.ones(len(articles), dtype=bool)
+    order = []
+    for _ in range(len(articles)):
+        scores = np.where(available, relevance - diversity * redundancy, -np.inf)
+        pick = int(np.argmax(scores))
+        order.append(pick)
+        available[pick] = False
+        np.maximum(redundancy, pairwise[pick], out=redundancy)
+    return [articles[i] for i in order]
+
+
+def _row_to_article(row: dict) -> Article:
+    """Convert a match_articles row to an Article."""
+    return Article(
+        article_number=row.get("article_number"),
+        text_arabic=row.get("text_arabic"),
+        text_english=row.get("text_english"),
+        hierarchy_path=row.get("hierarchy_path"),
+        similarity=row.get("similarity", 0.0),
+    )
 
 
 class RAGClient:
@@ -66,6 +148,7 @@ class RAGClient:
         query: str,
         limit: Optional[int] = None,
         similarity_threshold: Optional[float] = None,
+        with_embeddings: bool = False,
     ) -> list[Article]:
         """
         Retrieve relevant articles using semantic search.
@@ -74,40 +157,82 @@ class RAGClient:
             query: The search query (will be embedded)
             limit: Maximum number of articles to return
             similarity_threshold: Minimum similarity score
+            with_embeddings: Also load each article's stored embedding, which
+                format_articles_for_context needs for diversity reranking
             
         Returns:
             List of relevant articles sorted by similarity
         """
         # Generate embedding for query
-        embedding = await self.llm.get_embedding(query)
-        
+        embedding = await self.llm.get_embedding_array(query)
+        articles = await self._search_by_embedding(embedding, limit, similarity_threshold)
+        if with_embeddings:
+            await self._attach_embeddings(articles)
+        return articles
+    
+    async def _search_by_embedding(
+        self,
+        embedding: np.ndarray,
+        limit: Optional[int] = None,
+        similarity_threshold: Optional[float] = None,
+    ) -> list[Article]:
+        """Run the match_articles search for an embedding (off the event loop)."""
         # Call the match_articles Supabase function
-        result = self.supabase.rpc(
-            'match_articles',
-            {
-                'query_embedding': embedding,
-                'match_threshold': similarity_threshold or self.similarity_threshold,
-                'match_count': limit or self.default_limit,
-            }
-        ).execute()
-        
-        # Convert to Article objects
-        articles = []
-        for row in result.data or []:
-            articles.append(Article(
-                article_number=row.get("article_number"),
-                text_arabic=row.get("text_arabic"),
-                text_english=row.get("text_english"),
-                hierarchy_path=row.get("hierarchy_path"),
-                similarity=row.get("similarity", 0.0),
-            ))
+        result = await asyncio.to_thread(
+            self.supabase.rpc(
+                'match_articles',
+                {
+                    'query_embedding': _vector_literal(embedding),
+                    'match_threshold': similarity_threshold or self.similarity_threshold,
+                    'match_count': limit or self.default_limit,
+                }
+            ).execute
+        )
         
-        return articles
+        return [_row_to_article(row) for row in result.data or []]
+    
+    async def _search_by_embeddings(
+        self,
+        embeddings: list[np.ndarray],
+        limit: int,
+    ) -> list[list[Article]]:
+        """
+        Run match_articles for several embeddings in one match_articles_batch RPC.
+        
+        Falls back to parallel per-embedding searches if the batch RPC fails.
+        """
+        try:
+            result = await asyncio.to_thread(
+                self.supabase.rpc(
+                    'match_articles_batch',
+                    {
+                        'query_embeddings': [_vector_literal(e) for e in embeddings],
+                        'match_threshold': self.similarity_threshold,
+                        'match_count': limit,
+                    }
+                ).execute
+            )
+        except APIError as e:
+            # e.g. match_articles_batch not deployed or with another signature
+            logger.warning(f"match_articles_batch failed, searching per query: {e}")
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT_SEARCHES)
+            
+            async def search(embedding: np.ndarray) -> list[Article]:
+                async with semaphore:
+                    return await self._search_by_embedding(embedding, limit)
+            
+            return list(await asyncio.gather(*[search(e) for e in embeddings]))
+        
+        grouped: list[list[Article]] = [[] for _ in embeddings]
+        for row in result.data or []:
+            grouped[row["query_idx"]].append(_row_to_article(row))
+        return grouped
     
     async def retrieve_articles_for_questions(
         self,
         questions: list[str],
         limit_per_question: int = 3,
+        with_embeddings: bool = False,
     ) -> dict[str, list[Article]]:
         """
         Retrieve articles for multiple questions.
@@ -115,34 +240,104 @@ class RAGClient:
         Args:
             questions: List of questions to search for
             limit_per_question: Max articles per question
+            with_embeddings: Also load each article's stored embedding (one
+                query for all questions), for diversity reranking
             
         Returns:
             Dict mapping question to relevant articles
         """
-        results = {}
-        for question in questions:
-            articles = await self.retrieve_articles(
-                query=question,
-                limit=limit_per_question,
-            )
-            results[question] = articles
-        return results
+        if not questions:
+            return {}
+        
+        # One embedding request and one search round-trip for all questions
+        embeddings = await self.llm.get_embedding_arrays(questions)
+        searches = await self._search_by_embeddings(embeddings, limit_per_question)
+        if with_embeddings:
+            await self._attach_embeddings([a for articles in searches for a in articles])
+        return dict(zip(questions, searches))
+    
+    @staticmethod
+    def _merge_question_results(results: dict[str, list[Article]]) -> list[Article]:
+        """
+        Combine per-question results into one ranked, deduplicated list.
+        
+        Each article appears once with its best similarity across questions,
+        sorted by similarity, highest first.
+        """
+        articles = [a for question_articles in results.values() for a in question_articles]
+        if not articles:
+            return []
+        
+        numbers = np.fromiter((a.article_number for a in articles), dtype=np.int64, count=len(articles))
+        sims = np.fromiter((a.similarity for a in articles), dtype=np.float32, count=len(articles))
+        
+        # Best hit per article: order by similarity, keep first occurrence of each number
+        by_sim = np.argsort(-sims, kind="stable")
+        _, first = np.unique(numbers[by_sim], return_index=True)
+        best = by_sim[first]
+        best = best[np.argsort(-sims[best], kind="stable")]
+        return [articles[i] for i in best]
+    
+    async def _attach_embeddings(self, articles: list[Article]) -> None:
+        """
+        Load stored embeddings for articles that lack one, in a single query.
+        
+        Needed before mmr_rerank; match_articles does not return embeddings.
+        """
+        numbers = list({a.article_number for a in articles if a.embedding is None})
+        if not numbers:
+            return
+        
+        result = await asyncio.to_thread(
+            self.supabase.table('articles')
+            .select('article_number, embedding')
+            .in_('article_number', numbers)
+            .execute
+        )
+        # pgvector columns come back as '[x,y,...]' text
+        vectors = {
+            row['article_number']: np.array(json.loads(row['embedding']), dtype=np.float32)
+            for row in result.data or []
+            if row.get('embedding')
+        }
+        for article in articles:
+            vector = vectors.get(article.article_number)
+            if article.embedding is None and vector is not None:
+                norm = np.linalg.norm(vector)
+                article.embedding = vector / norm if norm else vector
     
     def format_articles_for_context(
         self,
-        articles: list[Article],
+        articles: list[Article] | dict[str, list[Article]],
         max_chars: int = 8000,
+        diversity: Optional[float] = None,
     ) -> str:
-        """Format articles as context string for LLM."""
-        context_parts = []
-        total_chars = 0
+        """
+        Format articles as context string for LLM.
         
-        for article in articles:
-            article_str = article.to_context_string()
-            if total_chars + len(article_str) > max_chars:
-                break
-            context_parts.append(article_str)
-            total_chars += len(article_str)
+        Per-question results from retrieve_articles_for_questions are merged
+        first, so an article found by several questions appears once, ranked
+        by its best similarity.
+        
+        If diversity is given, articles are first reordered with mmr_rerank so
+        near-duplicates don't crowd others out of max_chars (requires
+        retrieving them with with_embeddings=True).
+        """
+        if isinstance(articles, dict):
+            articles = self._merge_question_results(articles)
+        if diversity is not None:
+            articles = mmr_rerank(articles, diversity)
+        
+        # Articles past this point can't fit even before their hierarchy is
+        # added, so only this prefix gets formatted
+        candidates = bisect_right(
+            list(accumulate(a.min_context_length() for a in articles)), max_chars
+        )
+        context_parts = [a.to_context_string() for a in islice(articles, candidates)]
+        
+        # Keep the longest prefix of articles that fits within max_chars
+        fits = bisect_right(list(accumulate(map(len, context_parts))), max_chars)
+        context_parts = context_parts[:fits]
         
         if not context_parts:
             return "No relevant legal articles found."
@@ -156,12 +351,15 @@ class RAGClient:
 
 # Singleton instance
 _rag_client: Optional[RAGClient] = None
+_rag_client_lock = threading.Lock()
 
 
 def get_rag_client() -> RAGClient:
-    """Get or create the singleton RAG client."""
+    """Get or create the singleton RAG client (safe under concurrent first calls)."""
     global _rag_client
     if _rag_client is None:
-        _rag_client = RAGClient()
+        with _rag_client_lock:
+            if _rag_client is None:
+                _rag_client = RAGClient()
     return _rag_client
 
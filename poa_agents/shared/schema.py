@@ -10,8 +10,9 @@ This module contains:
 """
 
 from datetime import date, datetime
+from functools import cached_property
 from typing import Optional, Literal, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, TypeAdapter, field_validator
 from enum import Enum
 
 
@@ -66,11 +67,26 @@ class ConfidenceLevel(str, Enum):
     LOW = "LOW"
 
 
+# Field type for confidence levels (see IssueCategoryName)
+ConfidenceLevelName = Literal["HIGH", "MEDIUM", "LOW"]
+
+
 # ============================================================================
 # Data Models - Database Entities
 # ============================================================================
 
-class PersonalParty(BaseModel):
+class DBEntity(BaseModel):
+    """
+    Base for models of database rows.
+
+    Validators are built on first use rather than at import, so agents that
+    import the shared package but never load these entities don't pay for
+    the nested schema builds.
+    """
+    model_config = ConfigDict(defer_build=True)
+
+
+class PersonalParty(DBEntity):
     """A party (individual or entity) in an application."""
     id: str
     qid: Optional[str] = None
@@ -85,7 +101,7 @@ class PersonalParty(BaseModel):
     entity_type: Optional[str] = None
 
 
-class ApplicationPartyRole(BaseModel):
+class ApplicationPartyRole(DBEntity):
     """A party's role in an application."""
     id: str
     application_id: str
@@ -100,7 +116,7 @@ class ApplicationPartyRole(BaseModel):
     personal_party: Optional[PersonalParty] = None
 
 
-class Attachment(BaseModel):
+class Attachment(DBEntity):
     """An uploaded document."""
     id: str
     application_id: str
@@ -117,7 +133,7 @@ class Attachment(BaseModel):
     document_extractions: list["DocumentExtraction"] = Field(default_factory=list)
 
 
-class DocumentExtraction(BaseModel):
+class DocumentExtraction(DBEntity):
     """OCR extraction results for a document."""
     id: str
     attachment_id: str
@@ -131,7 +147,7 @@ class DocumentExtraction(BaseModel):
     bounding_boxes: dict = Field(default_factory=dict)
 
 
-class POAExtraction(BaseModel):
+class POAExtraction(DBEntity):
     """Structured extraction of POA-specific fields."""
     id: str
     attachment_id: Optional[str] = None
@@ -155,7 +171,7 @@ class POAExtraction(BaseModel):
     full_text_en: Optional[str] = None
 
 
-class Application(BaseModel):
+class Application(DBEntity):
     """A POA application with all related data."""
     id: str
     sak_case_number: Optional[str] = None
@@ -173,8 +189,25 @@ class Application(BaseModel):
     attachments: list[Attachment] = Field(default_factory=list)
     poa_extractions: list[POAExtraction] = Field(default_factory=list)
 
-
-class TransactionConfig(BaseModel):
+    # (grantors, agents), filled on first partition_roles() call
+    _roles_partition: Optional[
+        tuple[list[ApplicationPartyRole], list[ApplicationPartyRole]]
+    ] = PrivateAttr(default=None)
+
+    def partition_roles(self) -> tuple[list[ApplicationPartyRole], list[ApplicationPartyRole]]:
+        """Split party_roles into (grantors, agents) in one pass, once per instance."""
+        if self._roles_partition is None:
+            grantors, agents = [], []
+            for r in self.party_roles:
+                if r.party_position == "grantor":
+                    grantors.append(r)
+                elif r.party_position == "agent":
+                    agents.append(r)
+            self._roles_partition = (grantors, agents)
+        return self._roles_partition
+
+
+class TransactionConfig(DBEntity):
     """Configuration for a transaction type."""
     id: int
     transaction_type_code: str
@@ -245,97 +278,158 @@ class SubQuestionFinding(BaseModel):
 
 class LegalOpinion(BaseModel):
     """Complete Tier 2 legal opinion."""
+    model_config = ConfigDict(ignored_types=(cached_property,))
+
     application_id: str
     finding: LegalFinding
     confidence: float  # 0.0 - 1.0
-    confidence_level: ConfidenceLevel
-    analysis: dict[str, SubQuestionFinding] = Field(default_factory=dict)
+    confidence_level: ConfidenceLevelName
+    # One finding per sub-question; look up by id with analysis_by_id
+    analysis: list[SubQuestionFinding] = Field(default_factory=list)
     concerns: list[str] = Field(default_factory=list)
     recommendations: list[str] = Field(default_factory=list)
     legal_citations: list[ArticleCitation] = Field(default_factory=list)
     opinion_text: str = ""
 
+    @field_validator("analysis", mode="before")
+    @classmethod
+    def _analysis_from_mapping(cls, value: Any) -> Any:
+        """Accept the older {sub_question_id: finding} shape."""
+        if isinstance(value, dict):
+            return list(value.values())
+        return value
+
+    @cached_property
+    def analysis_by_id(self) -> dict[str, SubQuestionFinding]:
+        """Findings keyed by sub_question_id (built on first access)."""
+        return {f.sub_question_id: f for f in self.analysis}
+
 
 # ============================================================================
 # Case Bundle
 # ============================================================================
 
+# Blocks of CaseBundle.to_summary, in output order
+SUMMARY_SECTIONS = ("header", "parties", "poa", "tier1", "attachments")
+
+
 class CaseBundle(BaseModel):
     """
     Complete information package for Tier 2 legal reasoning.
     Assembled by orchestrator from application data + Tier 1 results.
     """
+    model_config = ConfigDict(ignored_types=(cached_property,))
+
     application: Application
     tier1_result: Tier1ValidationResult
     transaction_config: Optional[TransactionConfig] = None
 
-    # Convenience accessors
+    # Convenience accessors (the role split is cached on the Application and
+    # shared by everything that holds it; build bundles from loaded applications)
     @property
     def grantors(self) -> list[ApplicationPartyRole]:
-        return [r for r in self.application.party_roles if r.party_position == "grantor"]
+        return self.application.partition_roles()[0]
 
     @property
     def agents(self) -> list[ApplicationPartyRole]:
-        return [r for r in self.application.party_roles if r.party_position == "agent"]
+        return self.application.partition_roles()[1]
 
-    @property
+    @cached_property
     def poa_extraction(self) -> Optional[POAExtraction]:
         return self.application.poa_extractions[0] if self.application.poa_extractions else None
 
-    def to_summary(self) -> str:
-        """Generate a text summary of the case for LLM context."""
+    def to_summary(self, sections: Optional[set[str]] = None) -> str:
+        """
+        Generate a text summary of the case for LLM context.
+
+        Args:
+            sections: Blocks to include (see SUMMARY_SECTIONS); all by default
+        """
+        formatters = {
+            "header": self._fmt_header,
+            "parties": self._fmt_parties,
+            "poa": self._fmt_poa,
+            "tier1": self._fmt_tier1,
+            "attachments": self._fmt_attachments,
+        }
+        parts = ["", "=== CASE BUNDLE SUMMARY ===", ""]
+        for name in SUMMARY_SECTIONS:
+            if sections is None or name in sections:
+                parts.extend(formatters[name]())
+                parts.append("")
+        parts.extend(["=== END SUMMARY ===", ""])
+        return "\n".join(parts)
+
+    def _fmt_header(self) -> list[str]:
+        app = self.application
+        return [
+            f"Application ID: {app.id}",
+            f"Case Number: {app.sak_case_number}",
+            f"Transaction Type: {app.transaction_type_code}",
+            f"Transaction Value: {app.transaction_value or 'N/A'}",
+            "",
+            f"Subject (EN): {app.transaction_subject_en}",
+            f"Subject (AR): {app.transaction_subject_ar}",
+        ]
+
+    def _fmt_parties(self) -> list[str]:
+        grantor_lines = [_party_line(r) for r in self.grantors if r.personal_party]
+        agent_lines = [_party_line(r) for r in self.agents if r.personal_party]
+        return [
+            "GRANTORS:",
+            *(grantor_lines or ["  None"]),
+            "",
+            "AGENTS:",
+            *(agent_lines or ["  None"]),
+        ]
+
+    def _fmt_poa(self) -> list[str]:
         poa = self.poa_extraction
-
-        grantors_text = "\n".join([
-            f"  - {r.personal_party.name_en or r.personal_party.name_ar} (QID: {r.personal_party.qid}, Role: {r.role_code})"
-            for r in self.grantors if r.personal_party
-        ])
-
-        agents_text = "\n".join([
-            f"  - {r.personal_party.name_en or r.personal_party.name_ar} (QID: {r.personal_party.qid}, Role: {r.role_code})"
-            for r in self.agents if r.personal_party
-        ])
-
-        powers_text = "\n".join([f"  - {p}" for p in (poa.granted_powers_en if poa else [])])
-
-        return f"""
-=== CASE BUNDLE SUMMARY ===
-
-Application ID: {self.application.id}
-Case Number: {self.application.sak_case_number}
-Transaction Type: {self.application.transaction_type_code}
-Transaction Value: {self.application.transaction_value or "N/A"}
-
-Subject (EN): {self.application.transaction_subject_en}
-Subject (AR): {self.application.transaction_subject_ar}
-
-GRANTORS:
-{grantors_text or "  None"}
-
-AGENTS:
-{agents_text or "  None"}
-
-POA DETAILS:
-  Type: {"General" if poa and poa.is_general_poa else "Special" if poa and poa.is_special_poa else "Unknown"}
-  POA Number: {poa.poa_number if poa else "N/A"}
-  Issue Date: {poa.poa_date if poa else "N/A"}
-  Expiry Date: {poa.poa_expiry if poa else "N/A"}
-  Substitution Allowed: {poa.has_substitution_right if poa else "Unknown"}
-
-GRANTED POWERS:
-{powers_text or "  Not specified"}
-
-TIER 1 VALIDATION:
-  Status: {self.tier1_result.overall_status}
-  Blocking Failures: {self.tier1_result.blocking_failures}
-  Warnings: {self.tier1_result.warnings}
-
-ATTACHMENTS:
-  Total: {len(self.application.attachments)}
-  Types: {", ".join(set(a.document_type_code or "Unknown" for a in self.application.attachments))}
-
-=== END SUMMARY ===
-"""
+        if poa is None:
+            poa_type = substitution = "Unknown"
+            poa_number = poa_date = poa_expiry = "N/A"
+            power_lines = []
+        else:
+            poa_type = "General" if poa.is_general_poa else "Special" if poa.is_special_poa else "Unknown"
+            poa_number, poa_date, poa_expiry = poa.poa_number, poa.poa_date, poa.poa_expiry
+            substitution = poa.has_substitution_right
+            power_lines = [f"  - {p}" for p in poa.granted_powers_en]
+        return [
+            "POA DETAILS:",
+            f"  Type: {poa_type}",
+            f"  POA Number: {poa_number}",
+            f"  Issue Date: {poa_date}",
+            f"  Expiry Date: {poa_expiry}",
+            f"  Substitution Allowed: {substitution}",
+            "",
+            "GRANTED POWERS:",
+            *(power_lines or ["  Not specified"]),
+        ]
+
+    def _fmt_tier1(self) -> list[str]:
+        t1 = self.tier1_result
+        return [
+            "TIER 1 VALIDATION:",
+            f"  Status: {t1.overall_status}",
+            f"  Blocking Failures: {t1.blocking_failures}",
+            f"  Warnings: {t1.warnings}",
+        ]
+
+    def _fmt_attachments(self) -> list[str]:
+        attachments = self.application.attachments
+        # dict.fromkeys dedupes in first-seen order, so the prompt text is stable
+        attachment_types = ", ".join(dict.fromkeys(a.document_type_code or "Unknown" for a in attachments))
+        return [
+            "ATTACHMENTS:",
+            f"  Total: {len(attachments)}",
+            f"  Types: {attachment_types}",
+        ]
+
+
+def _party_line(role: ApplicationPartyRole) -> str:
+    """Format a party role as a summary bullet (role must have personal_party)."""
+    party = role.personal_party
+    return f"  - {party.name_en or party.name_ar} (QID: {party.qid}, Role: {role.role_code})"
 
 
 # ============================================================================
@@ -354,6 +448,20 @@ class IssueCategory(str, Enum):
     BUSINESS_RULES = "business_rules"
 
 
+# Field type for issue categories: validated as a plain string membership check
+# rather than through an Enum validator; IssueCategory members compare equal
+IssueCategoryName = Literal[
+    "grantor_capacity",
+    "agent_capacity",
+    "poa_scope",
+    "substitution_rights",
+    "formalities",
+    "validity",
+    "compliance",
+    "business_rules",
+]
+
+
 class PartyFact(BaseModel):
     """Structured facts about a party."""
     name_ar: str
@@ -391,7 +499,7 @@ class PowersFact(BaseModel):
 class OpenQuestion(BaseModel):
     """A question for Tier 2 legal research."""
     question_id: str
-    category: IssueCategory
+    category: IssueCategoryName
     question: str
     relevant_facts: list[str] = Field(default_factory=list)
     priority: Literal["critical", "important", "supplementary"] = "important"
@@ -438,7 +546,7 @@ class LegalBrief(BaseModel):
 class LegalIssue(BaseModel):
     """A decomposed legal issue to research."""
     issue_id: str
-    category: IssueCategory
+    category: IssueCategoryName
     primary_question: str
     sub_questions: list[str] = Field(default_factory=list)
     relevant_facts: list[str] = Field(default_factory=list)
@@ -459,7 +567,7 @@ class RetrievedArticle(BaseModel):
 class IssueFinding(BaseModel):
     """Finding for a single legal issue."""
     issue_id: str
-    category: IssueCategory
+    category: IssueCategoryName
     finding: Literal["SUPPORTED", "NOT_SUPPORTED", "PARTIALLY_SUPPORTED", "UNCLEAR"]
     confidence: float  # 0.0 - 1.0
     reasoning: str
@@ -483,7 +591,7 @@ class LegalResearchResult(BaseModel):
     # Overall Opinion
     overall_finding: LegalFinding
     confidence_score: float
-    confidence_level: ConfidenceLevel
+    confidence_level: ConfidenceLevelName
 
     # Decision
     decision_bucket: Literal["valid", "valid_with_remediations", "invalid", "needs_review"]
@@ -510,3 +618,12 @@ class LegalResearchResult(BaseModel):
     llm_model: Optional[str] = None
     total_tokens: Optional[int] = None
 
+
+# ============================================================================
+# Bulk Validators
+# ============================================================================
+
+# Validate whole lists (e.g. LLM JSON output) in one pass with a schema built
+# once at import; use validate_json on raw bytes to skip json.loads
+ISSUE_FINDINGS_ADAPTER: TypeAdapter[list[IssueFinding]] = TypeAdapter(list[IssueFinding])
+RETRIEVED_ARTICLES_ADAPTER: TypeAdapter[list[RetrievedArticle]] = TypeAdapter(list[RetrievedArticle])
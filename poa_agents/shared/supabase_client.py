@@ -2,38 +2,139 @@
 Supabase client for POA agents.
 """
 
+import asyncio
 import os
-from typing import Optional
+import threading
+from collections import defaultdict
+from typing import Optional, TypeVar
+
+from agentex.lib.utils.logging import make_logger
+from postgrest.exceptions import APIError
+from pydantic import BaseModel
 from supabase import create_client, Client
 
+from .postgrest_session import insert_json, use_pooled_session
+from .schema import (
+    Application,
+    ApplicationPartyRole,
+    Attachment,
+    DocumentExtraction,
+    PersonalParty,
+    POAExtraction,
+    TransactionConfig,
+)
+
+logger = make_logger(__name__)
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+# PostgREST error codes that mean the server lacks a function or relationship
+# (e.g. a migration that hasn't been run), as opposed to a real failure
+PGRST_FUNCTION_NOT_FOUND = "PGRST202"
+PGRST_RELATIONSHIP_NOT_FOUND = ("PGRST200", "PGRST201")
+
+# load_application_light: everything Tier 1 reads, minus OCR text, bounding
+# boxes and full POA text (the bulk of a full application payload)
+APPLICATION_LIGHT_SELECT = (
+    "*, "
+    "party_roles:application_party_roles(*, personal_parties(*)), "
+    "attachments(*, document_extractions(id, attachment_id, extraction_model, "
+    "confidence_overall, extracted_fields, field_confidences)), "
+    "poa_extractions(id, attachment_id, application_id, poa_number, poa_date, "
+    "poa_expiry, issuing_authority, principal_name_ar, principal_name_en, "
+    "principal_qid, agent_name_ar, agent_name_en, agent_qid, granted_powers, "
+    "granted_powers_en, is_general_poa, is_special_poa, has_substitution_right)"
+)
 
+
+# Singleton instance
 _supabase_client: Optional[Client] = None
+_supabase_client_lock = threading.Lock()
 
 
 def get_supabase_client() -> Client:
-    """Get or create the Supabase client singleton."""
+    """Get or create the Supabase client singleton (safe under concurrent first calls)."""
     global _supabase_client
-    
     if _supabase_client is None:
-        url = os.getenv("SUPABASE_URL")
-        key = os.getenv("SUPABASE_ANON_KEY")
-        
-        if not url:
-            raise ValueError("SUPABASE_URL environment variable is required")
-        if not key:
-            raise ValueError("SUPABASE_ANON_KEY environment variable is required")
-        
-        _supabase_client = create_client(url, key)
-    
+        with _supabase_client_lock:
+            if _supabase_client is None:
+                _supabase_client = _create_supabase_client()
     return _supabase_client
 
 
+def _create_supabase_client() -> Client:
+    """Create the Supabase client from SUPABASE_URL / SUPABASE_ANON_KEY."""
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_ANON_KEY")
+    
+    if not url:
+        raise ValueError("SUPABASE_URL environment variable is required")
+    if not key:
+        raise ValueError("SUPABASE_ANON_KEY environment variable is required")
+    
+    client = create_client(url, key)
+    use_pooled_session(client, max_connections=10)
+    return client
+
+
+def reset_supabase_client() -> None:
+    """Drop the cached client so the next get_supabase_client() creates a new one."""
+    global _supabase_client
+    with _supabase_client_lock:
+        _supabase_client = None
+
+
 # ============================================================================
 # Data Access Functions
 # ============================================================================
 
 def load_application(application_id: str) -> dict:
-    """Load application with all related data."""
+    """
+    Load application with all related data.
+
+    Uses the get_application_bundle RPC (one round-trip), falling back to
+    per-table queries if the function isn't deployed (migration 006) or
+    finds nothing.
+    """
+    client = get_supabase_client()
+    
+    try:
+        result = client.rpc("get_application_bundle", {"app_id": application_id}).execute()
+    except APIError as e:
+        if e.code != PGRST_FUNCTION_NOT_FOUND:
+            raise
+        logger.warning(f"get_application_bundle not deployed, loading per table: {e.message}")
+    else:
+        if result.data:
+            return result.data
+    
+    return _load_application_tables(application_id)
+
+
+def load_application_light(application_id: str) -> dict:
+    """
+    Load an application for rule checks, without OCR and POA full text.
+
+    Same shape as load_application in one embedded query, but extractions
+    carry only their structured fields. Falls back to load_application if
+    PostgREST can't resolve one of the embedded relationships.
+    """
+    client = get_supabase_client()
+    
+    try:
+        result = client.table("applications").select(
+            APPLICATION_LIGHT_SELECT
+        ).eq("id", application_id).single().execute()
+    except APIError as e:
+        if e.code not in PGRST_RELATIONSHIP_NOT_FOUND:
+            raise
+        logger.warning(f"Light application select unavailable, loading in full: {e.message}")
+        return load_application(application_id)
+    return result.data
+
+
+def _load_application_tables(application_id: str) -> dict:
+    """Load application with all related data, one query per table."""
     client = get_supabase_client()
     
     # Get application
@@ -59,6 +160,102 @@ def load_application(application_id: str) -> dict:
     return application
 
 
+def load_applications(application_ids: list[str]) -> dict[str, dict]:
+    """
+    Load several applications with all related data in four queries.
+
+    Returns a dict keyed by application id, shaped like load_application;
+    ids that don't exist are left out.
+    """
+    if not application_ids:
+        return {}
+    client = get_supabase_client()
+    ids = list(dict.fromkeys(application_ids))
+    
+    apps_result = client.table("applications").select("*").in_("id", ids).execute()
+    roles_result = client.table("application_party_roles").select(
+        "*, personal_parties(*)"
+    ).in_("application_id", ids).execute()
+    attachments_result = client.table("attachments").select(
+        "*, document_extractions(*)"
+    ).in_("application_id", ids).execute()
+    poa_result = client.table("poa_extractions").select("*").in_("application_id", ids).execute()
+    
+    # application_id -> related rows, one pass per table
+    related: dict[str, dict[str, list]] = defaultdict(lambda: defaultdict(list))
+    for key, rows in (
+        ("party_roles", roles_result.data),
+        ("attachments", attachments_result.data),
+        ("poa_extractions", poa_result.data),
+    ):
+        for row in rows or []:
+            related[row["application_id"]][key].append(row)
+    
+    applications = {}
+    for application in apps_result.data or []:
+        children = related[application["id"]]
+        application["party_roles"] = children["party_roles"]
+        application["attachments"] = children["attachments"]
+        application["poa_extractions"] = children["poa_extractions"]
+        applications[application["id"]] = application
+    return applications
+
+
+def _construct(model_cls: type[ModelT], data: dict) -> ModelT:
+    """
+    Build a model from a trusted Supabase row without running validators.
+
+    Values are kept as returned (e.g. timestamps stay ISO strings); columns
+    the model doesn't declare are dropped.
+    """
+    return model_cls.model_construct(
+        _fields_set=data.keys() & model_cls.model_fields.keys(),
+        **data,
+    )
+
+
+def load_application_model(application_id: str) -> Application:
+    """
+    Load an application with all related data as an Application model.
+
+    Rows come straight from our own tables, so the models are constructed
+    without validation; use Application.model_validate for untrusted input.
+    """
+    application = load_application(application_id)
+    
+    party_roles = [
+        _construct(ApplicationPartyRole, {
+            **role,
+            "personal_party": (
+                _construct(PersonalParty, role["personal_parties"])
+                if role.get("personal_parties") else None
+            ),
+        })
+        for role in application.get("party_roles") or []
+    ]
+    attachments = [
+        _construct(Attachment, {
+            **attachment,
+            "document_extractions": [
+                _construct(DocumentExtraction, extraction)
+                for extraction in attachment.get("document_extractions") or []
+            ],
+        })
+        for attachment in application.get("attachments") or []
+    ]
+    poa_extractions = [
+        _construct(POAExtraction, extraction)
+        for extraction in application.get("poa_extractions") or []
+    ]
+    
+    return _construct(Application, {
+        **application,
+        "party_roles": party_roles,
+        "attachments": attachments,
+        "poa_extractions": poa_extractions,
+    })
+
+
 def load_transaction_config(transaction_type_code: str) -> dict:
     """Load transaction configuration for validation."""
     client = get_supabase_client()
@@ -70,25 +267,36 @@ def load_transaction_config(transaction_type_code: str) -> dict:
     return result.data
 
 
+def load_transaction_config_model(transaction_type_code: str) -> TransactionConfig:
+    """Load transaction configuration as a TransactionConfig model (trusted row, not validated)."""
+    return _construct(TransactionConfig, load_transaction_config(transaction_type_code))
+
+
+def _insert_json(table: str, records: dict | list[dict]) -> list[dict]:
+    """Insert rows through the pooled session, encoding the body with orjson."""
+    return insert_json(get_supabase_client(), table, records)
+
+
 def save_validation_report(report: dict) -> dict:
     """Save a validation report."""
-    client = get_supabase_client()
-    result = client.table("validation_reports").insert(report).execute()
-    return result.data[0]
+    return _insert_json("validation_reports", report)[0]
 
 
 def save_legal_opinion(opinion: dict) -> dict:
     """Save a legal opinion."""
-    client = get_supabase_client()
-    result = client.table("legal_opinions").insert(opinion).execute()
-    return result.data[0]
+    return _insert_json("legal_opinions", opinion)[0]
 
 
 def save_research_trace(trace: dict) -> dict:
     """Save a research trace."""
-    client = get_supabase_client()
-    result = client.table("research_traces").insert(trace).execute()
-    return result.data[0]
+    return _insert_json("research_traces", trace)[0]
+
+
+def save_research_traces(traces: list[dict]) -> list[dict]:
+    """Save several research traces in one bulk insert."""
+    if not traces:
+        return []
+    return _insert_json("research_traces", traces)
 
 
 def update_research_trace(trace_id: str, updates: dict) -> dict:
@@ -100,9 +308,14 @@ def update_research_trace(trace_id: str, updates: dict) -> dict:
 
 def save_escalation(escalation: dict) -> dict:
     """Save an escalation."""
-    client = get_supabase_client()
-    result = client.table("escalations").insert(escalation).execute()
-    return result.data[0]
+    return _insert_json("escalations", escalation)[0]
+
+
+def save_escalations(escalations: list[dict]) -> list[dict]:
+    """Save several escalations in one bulk insert."""
+    if not escalations:
+        return []
+    return _insert_json("escalations", escalations)
 
 
 def update_application_status(application_id: str, status: str, **kwargs) -> dict:
@@ -112,3 +325,34 @@ def update_application_status(application_id: str, status: str, **kwargs) -> dic
     result = client.table("applications").update(updates).eq("id", application_id).execute()
     return result.data[0]
 
+
+# ============================================================================
+# Async Write Helpers
+# ============================================================================
+# The client is synchronous; these run a write in a worker thread so async
+# callers keep their event loop free and can overlap independent writes,
+# e.g. asyncio.gather(asave_legal_opinion(...), asave_research_trace(...)).
+
+async def asave_validation_report(report: dict) -> dict:
+    """Save a validation report without blocking the event loop."""
+    return await asyncio.to_thread(save_validation_report, report)
+
+
+async def asave_legal_opinion(opinion: dict) -> dict:
+    """Save a legal opinion without blocking the event loop."""
+    return await asyncio.to_thread(save_legal_opinion, opinion)
+
+
+async def asave_research_trace(trace: dict) -> dict:
+    """Save a research trace without blocking the event loop."""
+    return await asyncio.to_thread(save_research_trace, trace)
+
+
+async def asave_escalation(escalation: dict) -> dict:
+    """Save an escalation without blocking the event loop."""
+    return await asyncio.to_thread(save_escalation, escalation)
+
+
+async def aupdate_application_status(application_id: str, status: str, **kwargs) -> dict:
+    """Update application status without blocking the event loop."""
+    return await asyncio.to_thread(update_application_status, application_id, status, **kwargs)
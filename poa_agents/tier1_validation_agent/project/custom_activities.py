@@ -17,9 +17,9 @@ from agentex.lib.utils.logging import make_logger
 
 from shared.supabase_client import (
     get_supabase_client,
-    load_application,
+    load_application_light,
     load_transaction_config,
-    save_validation_report,
+    asave_validation_report,
 )
 from shared.schema import Tier1CheckResult, Tier1CheckCategory, CheckStatus, Severity
 
@@ -48,10 +48,10 @@ class CustomActivities:
     
     @activity.defn(name=LOAD_APPLICATION)
     async def load_application_activity(self, params: dict) -> dict:
-        """Load application with all related data."""
+        """Load application with the related data the checks use (no OCR text)."""
         application_id = params.get("application_id")
         logger.info(f"Loading application: {application_id}")
-        return load_application(application_id)
+        return load_application_light(application_id)
     
     @activity.defn(name=LOAD_TRANSACTION_CONFIG)
     async def load_transaction_config_activity(self, params: dict) -> dict:
@@ -217,7 +217,7 @@ class CustomActivities:
             "agent_name": "poa-tier1-validation-agent",
         }
         
-        return save_validation_report(report)
+        return await asave_validation_report(report)
     
     @activity.defn(name=UPDATE_WORKFLOW_STATUS)
     async def update_workflow_status_activity(self, params: dict) -> None:
@@ -72,5 +72,10 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # uvloop cuts per-await overhead for the many small Supabase/OpenAI calls
+    if sys.platform != "win32":
+        import uvloop
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
 